@@ -50,3 +50,32 @@ class AudienceSegmentAdmin(admin.ModelAdmin):
 @admin.register(models.ContactPageContent)
 class ContactPageContentAdmin(admin.ModelAdmin):
     list_display = ('headline', 'support_email', 'updated_at')
+
+
+class PlanCityInline(admin.TabularInline):
+    model = models.PlanCity
+    extra = 0
+
+
+class PlanTaggingInline(admin.TabularInline):
+    model = models.PlanTagging
+    extra = 0
+
+
+@admin.register(models.Plan)
+class PlanAdmin(admin.ModelAdmin):
+    inlines = [PlanCityInline, PlanTaggingInline]
+    list_display = ('plan_name', 'provider', 'age_min', 'age_max', 'for_adult', 'for_child', 'updated_at')
+    list_filter = ('for_adult', 'for_child', 'is_government', 'provider')
+    search_fields = ('plan_name', 'slug', 'provider')
+    readonly_fields = ('slug',)
+
+
+@admin.register(models.City)
+class CityAdmin(admin.ModelAdmin):
+    search_fields = ('name',)
+
+
+@admin.register(models.PlanTag)
+class PlanTagAdmin(admin.ModelAdmin):
+    search_fields = ('label',)
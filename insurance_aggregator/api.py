@@ -0,0 +1,226 @@
+"""
+JSON read API over the plan catalog.
+
+``/api/plans/`` accepts the product page filters and pages through the matches
+with an opaque keyset cursor, so a deep page costs the same as the first one.
+Every response carries the catalog version it was served from; a cursor
+issued under another version is rejected instead of silently skipping plans.
+
+The ``city`` filter takes free text ("new havn", "boston massachusetts") and
+is resolved to the closest catalog city, which the response echoes as
+``city``; it is ``null`` when nothing was close enough.
+
+``/api/cities/`` answers city autocomplete from the catalog's prefix index.
+Given ``member`` or ``age``, its plan counts and ranking follow those filters
+and cities without a matching plan are left out.
+
+``/api/facets/`` returns the precomputed result counts for a member, age and
+city selection: the summary, the count per member option and the cities with
+the most matching plans.
+"""
+
+import base64
+import hashlib
+import json
+
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_GET
+
+from .catalog import get_plan_source
+from .data_loader import PlanRecord, filter_plans, page_plans
+from .query_budget import query_budget
+from .views import _parse_age, _parse_amount
+
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+CITY_MATCHES = 8
+CITY_MAX_MATCHES = 50
+API_CACHE_SECONDS = 60
+
+PLAN_FIELDS = PlanRecord.__slots__ + PlanRecord.DISPLAY_FIELDS
+
+
+def _error(message: str, status: int = 400) -> JsonResponse:
+    return JsonResponse({'error': message}, status=status)
+
+
+def encode_cursor(version: int, key) -> str:
+    payload = json.dumps([version, key], separators=(',', ':')).encode('ascii')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """Return ``(version, key)``; raises ``ValueError`` for anything malformed."""
+    try:
+        version, key = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (TypeError, ValueError) as exc:
+        raise ValueError('malformed cursor') from exc
+    # In-memory engines key on a plan id, the database on ``[position, id]``.
+    parts = key if isinstance(key, list) else [key]
+    if not parts or not all(type(part) is int and part >= 0 for part in parts):
+        raise ValueError('malformed cursor')
+    return version, key
+
+
+def _parse_fields(raw_fields: str) -> tuple:
+    if not raw_fields:
+        return PLAN_FIELDS
+    fields = tuple(dict.fromkeys(field.strip() for field in raw_fields.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in PLAN_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(PLAN_FIELDS)}.")
+    return fields or PLAN_FIELDS
+
+
+def _parse_limit(raw_limit: str, default: int = API_PAGE_SIZE, maximum: int = API_MAX_PAGE_SIZE) -> int:
+    if not raw_limit:
+        return default
+    try:
+        value = int(raw_limit)
+    except ValueError as exc:
+        raise ValueError('limit must be an integer.') from exc
+    return max(1, min(maximum, value))
+
+
+def _resolve_city(source, raw_city: str):
+    """The catalog city ``raw_city`` resolves to; unmatched input is kept so it matches no plans."""
+    requested = raw_city.strip()
+    if not requested:
+        return None
+    return source.city_index.resolve(requested) or requested
+
+
+def _parse_optional_age(raw_age):
+    if not raw_age:
+        return None
+    try:
+        int(raw_age)
+    except ValueError as exc:
+        raise ValueError('age must be an integer.') from exc
+    return _parse_age(raw_age)
+
+
+def _parse_optional_amount(raw_amount, name: str):
+    if not raw_amount:
+        return None
+    amount = _parse_amount(raw_amount)
+    if amount is None:
+        raise ValueError(f'{name} must be a whole dollar amount.')
+    return amount
+
+
+def _cacheable(request, payload: dict, version: int) -> JsonResponse:
+    response = JsonResponse(payload)
+    etag = f'"{hashlib.md5(response.content).hexdigest()}"'
+    response = get_conditional_response(request, etag=etag, response=response)
+    response['ETag'] = etag
+    response['X-Catalog-Version'] = str(version)
+    patch_cache_control(response, public=True, max_age=API_CACHE_SECONDS)
+    return response
+
+
+@query_budget(0, database=6)
+@require_GET
+def plans(request):
+    try:
+        fields = _parse_fields(request.GET.get('fields', ''))
+        limit = _parse_limit(request.GET.get('limit', ''))
+        age = _parse_optional_age(request.GET.get('age'))
+        max_deductible = _parse_optional_amount(request.GET.get('max_deductible'), 'max_deductible')
+        max_oop = _parse_optional_amount(request.GET.get('max_oop'), 'max_oop')
+    except ValueError as exc:
+        return _error(str(exc))
+
+    source = get_plan_source()
+    after = None
+    cursor = request.GET.get('cursor')
+    if cursor:
+        try:
+            version, after = decode_cursor(cursor)
+        except ValueError:
+            return _error('Invalid cursor.')
+        if version != source.version:
+            return _error('The plan catalog changed since this cursor was issued; start again from the first page.', 409)
+
+    city = _resolve_city(source, request.GET.get('city', ''))
+    matches = filter_plans(
+        source.plans,
+        request.GET.get('member', ''),
+        age,
+        city,
+        index=source.index,
+        max_deductible=max_deductible,
+        max_oop=max_oop,
+    )
+    try:
+        # One extra row tells us whether another page follows.
+        page = page_plans(matches, after, limit + 1)
+    except (TypeError, ValueError):
+        return _error('Invalid cursor.')
+
+    has_more = len(page) > limit
+    page = page[:limit]
+    payload = {
+        'catalog_version': source.version,
+        'city': city if city in source.city_index else None,
+        'count': len(matches),
+        'next_cursor': encode_cursor(source.version, page[-1][0]) if has_more else None,
+        'results': [{field: plan[field] for field in fields} for _, plan in page],
+    }
+    return _cacheable(request, payload, source.version)
+
+
+@query_budget(0, database=4)
+@require_GET
+def cities(request):
+    try:
+        limit = _parse_limit(request.GET.get('limit', ''), CITY_MATCHES, CITY_MAX_MATCHES)
+        age = _parse_optional_age(request.GET.get('age'))
+    except ValueError as exc:
+        return _error(str(exc))
+    query = request.GET.get('q', '')
+    source = get_plan_source()
+    member = request.GET.get('member', '')
+    if member or age is not None:
+        # Rank by the filtered counts so cities without a matching plan drop out.
+        plan_facets = source.facets
+        if query.strip():
+            matches = source.city_index.search_counted(
+                query, lambda city: plan_facets.count(member, age, city), limit
+            )
+        else:
+            matches = plan_facets.top_cities(member, age, limit)
+    else:
+        matches = source.city_index.search(query, limit)
+    payload = {
+        'catalog_version': source.version,
+        'query': query,
+        'results': [{'city': city, 'plan_count': plan_count} for city, plan_count in matches],
+    }
+    return _cacheable(request, payload, source.version)
+
+
+@query_budget(0, database=4)
+@require_GET
+def facets(request):
+    try:
+        limit = _parse_limit(request.GET.get('limit', ''), CITY_MATCHES, CITY_MAX_MATCHES)
+        age = _parse_optional_age(request.GET.get('age'))
+    except ValueError as exc:
+        return _error(str(exc))
+    source = get_plan_source()
+    member = request.GET.get('member', '')
+    city = _resolve_city(source, request.GET.get('city', ''))
+    plan_facets = source.facets
+    payload = {
+        'catalog_version': source.version,
+        'city': city if city in source.city_index else None,
+        'summary': plan_facets.summary(member, age, city),
+        'members': plan_facets.member_counts(age, city),
+        'cities': [
+            {'city': name, 'plan_count': plan_count}
+            for name, plan_count in plan_facets.top_cities(member, age, limit)
+        ],
+    }
+    return _cacheable(request, payload, source.version)
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class InsuranceAggregatorConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'insurance_aggregator'
+
+    def ready(self):
+        from .signals import connect_signals
+
+        connect_signals()
@@ -0,0 +1,480 @@
+"""
+Reloadable plan catalog.
+
+The normalized catalog and its query index are published together as an
+immutable ``CatalogSnapshot``. A background watcher checks the source file's
+mtime and size, confirms a real change by content hash, loads the matching
+precompiled snapshot or streams the feed into a new catalog off the request
+path and swaps the new snapshot in with a single assignment. A request
+that grabbed the previous snapshot keeps using it until it finishes.
+
+Reloads are incremental: every feed entry is hashed, and entries that hash
+the same as in the previous version keep their normalized record and their
+index postings. Only added and edited entries are normalized again.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+import weakref
+from collections.abc import Sequence
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+from django.db.models import Count, Max, Q
+
+from .catalog_snapshot import load_snapshot, write_snapshot
+from .city_index import CityIndex
+from .classification import get_classifier
+from .data_loader import DATA_PATH, HashingReader, file_digest, iter_plan_records, reusable_records
+from .facets import PlanFacets
+from .fragments import PlanFragments
+from .metrics import CATALOG_LOAD_SECONDS, CATALOG_PLAN_CHANGES, CATALOG_PLANS, CATALOG_RELOADS, CATALOG_VERSION
+from .plan_index import SEGMENT_FIELDS, PlanIndex
+from .timing import timed
+
+logger = logging.getLogger(__name__)
+
+
+def build_plan_index(plans: list, previous=None):
+    if settings.PLAN_CATALOG_MODE == 'columnar':
+        from .columnar import ColumnarCatalog
+
+        return ColumnarCatalog(plans)
+    if isinstance(previous, PlanIndex):
+        return PlanIndex.updated(previous, plans)
+    return PlanIndex(plans)
+
+
+class CatalogSnapshot:
+    """One immutable catalog version: plans, index and source identity."""
+
+    def __init__(
+        self,
+        plans: list,
+        index,
+        version: int,
+        digest: str,
+        source_stat: tuple,
+        rules_digest: str = '',
+        entry_hashes: Optional[list] = None,
+    ):
+        self.plans = plans
+        self.index = index
+        self.version = version
+        self.digest = digest
+        self.source_stat = source_stat
+        self.rules_digest = rules_digest
+        # Content hash of each plan's feed entry, parallel to ``plans``.
+        self.entry_hashes = entry_hashes
+        self.loaded_at = time.time()
+        self._city_index = None
+        self._facets = None
+        self._fragments = None
+        self._slugs = None
+
+    @property
+    def city_index(self) -> CityIndex:
+        if self._city_index is None:
+            self._city_index = CityIndex.from_plans(self.plans)
+        return self._city_index
+
+    @property
+    def facets(self) -> PlanFacets:
+        if self._facets is None:
+            self._facets = PlanFacets(self.plans)
+        return self._facets
+
+    @property
+    def fragments(self) -> PlanFragments:
+        if self._fragments is None:
+            self._fragments = PlanFragments()
+        return self._fragments
+
+    def cities(self) -> list:
+        return self.city_index.cities
+
+    def lookup(self, slugs) -> list:
+        """Plans for ``slugs`` in the order given; unknown slugs are skipped."""
+        if self._slugs is None:
+            # Built on the first lookup; most workers never compare plans by slug.
+            self._slugs = {plan.slug: plan for plan in self.plans}
+        return [self._slugs[slug] for slug in slugs if slug in self._slugs]
+
+    def __repr__(self):
+        return f'<CatalogSnapshot v{self.version} {self.digest[:12]} plans={len(self.plans)}>'
+
+
+class CatalogChanges(NamedTuple):
+    """Plans added, updated, removed and left unchanged by a reload, matched by slug."""
+
+    added: int
+    updated: int
+    removed: int
+    unchanged: int
+
+    @classmethod
+    def between(cls, previous: CatalogSnapshot, plans: list, entry_hashes: list) -> 'CatalogChanges':
+        before = {plan.slug: digest for plan, digest in zip(previous.plans, previous.entry_hashes)}
+        after = {plan.slug: digest for plan, digest in zip(plans, entry_hashes)}
+        kept = len(before.keys() & after.keys())
+        unchanged = sum(1 for slug, digest in after.items() if before.get(slug) == digest)
+        return cls(len(after) - kept, kept - unchanged, len(before) - kept, unchanged)
+
+    def __str__(self):
+        return f'{self.added} added, {self.updated} updated, {self.removed} removed'
+
+
+def _stat_signature(path: Path) -> tuple:
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _can_reuse(snapshot: Optional[CatalogSnapshot]) -> bool:
+    # Records derive provider and tags from the rules, so new rules mean a full rebuild.
+    return (
+        snapshot is not None
+        and snapshot.entry_hashes is not None
+        and snapshot.rules_digest == get_classifier().digest
+    )
+
+
+def compile_catalog(
+    path: Path,
+    source_stat: tuple,
+    snapshot_path: Optional[Path] = None,
+    previous: Optional[CatalogSnapshot] = None,
+) -> tuple:
+    """
+    Build ``(plans, index, digest, entry_hashes)`` from the feed and optionally persist a snapshot.
+
+    With a ``previous`` snapshot built from the same classification rules,
+    unchanged entries reuse its records and index postings.
+    """
+    reuse, previous_index = None, None
+    if _can_reuse(previous):
+        reuse, previous_index = reusable_records(previous.plans, previous.entry_hashes), previous.index
+    # Stream the feed straight into records, hashing the bytes on the way,
+    # so the raw JSON is never held in memory next to the catalog.
+    plans, entry_hashes = [], []
+    with Path(path).open('rb') as binary:
+        reader = HashingReader(binary)
+        for entry_digest, record in iter_plan_records(reader, reuse=reuse):
+            entry_hashes.append(entry_digest)
+            plans.append(record)
+    digest = reader.hexdigest()
+    index = build_plan_index(plans, previous_index)
+    if snapshot_path is not None:
+        try:
+            write_snapshot(
+                snapshot_path, plans, index, settings.PLAN_CATALOG_MODE, digest, source_stat, entry_hashes,
+            )
+        except OSError:
+            logger.warning('Could not write plan catalog snapshot to %s', snapshot_path, exc_info=True)
+    return plans, index, digest, entry_hashes
+
+
+class CatalogHolder:
+    def __init__(
+        self,
+        path: Path = DATA_PATH,
+        check_interval: Optional[float] = None,
+        snapshot_path: Optional[Path] = None,
+    ):
+        self.path = Path(path)
+        self.snapshot_path = Path(snapshot_path) if snapshot_path else None
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._reload_lock = threading.Lock()
+        self._watcher_lock = threading.Lock()
+        self._watcher = None
+        _holders.add(self)
+
+    def _after_fork(self) -> None:
+        # Threads do not survive fork; let each worker start its own watcher.
+        self._reload_lock = threading.Lock()
+        self._watcher_lock = threading.Lock()
+        self._watcher = None
+
+    def snapshot(self) -> CatalogSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._reload_lock:
+                if self._snapshot is None:
+                    self._publish()
+                snapshot = self._snapshot
+        if self._watcher is None:
+            self._start_watcher()
+        return snapshot
+
+    def check_for_update(self) -> bool:
+        """Rebuild and swap in a new snapshot if the source file changed."""
+        with self._reload_lock:
+            current = self._snapshot
+            if current is None:
+                self._publish()
+                return True
+            source_stat = _stat_signature(self.path)
+            # Edits to the classification rules change every derived field too.
+            rules_changed = get_classifier().digest != current.rules_digest
+            if source_stat == current.source_stat and not rules_changed:
+                return False
+            if not rules_changed and file_digest(self.path) == current.digest:
+                # Touched but identical: remember the new stat, keep the version.
+                touched = CatalogSnapshot(
+                    current.plans,
+                    current.index,
+                    current.version,
+                    current.digest,
+                    source_stat,
+                    current.rules_digest,
+                    current.entry_hashes,
+                )
+                touched._city_index = current._city_index
+                touched._facets = current._facets
+                touched._fragments = current._fragments
+                touched._slugs = current._slugs
+                self._snapshot = touched
+                return False
+            self._publish()
+            return True
+
+    def _publish(self) -> None:
+        started = time.perf_counter()
+        source_stat = _stat_signature(self.path)
+        previous = self._snapshot
+        compiled, origin = self._load_compiled(source_stat), 'snapshot'
+        if compiled is None:
+            origin = 'incremental' if _can_reuse(previous) else 'feed'
+            compiled = compile_catalog(self.path, source_stat, self.snapshot_path, previous)
+        plans, index, digest, entry_hashes = compiled
+        # Versions follow the source mtime (in ms) so every worker agrees on
+        # the number for the same file, and never go backwards locally.
+        version = source_stat[0] // 1_000_000
+        if previous is not None:
+            version = max(version, previous.version + 1)
+        snapshot = CatalogSnapshot(
+            plans, index, version, digest, source_stat, get_classifier().digest, entry_hashes,
+        )
+        # Build the city index, facets and comparison columns before publishing
+        # so requests never pay for them.
+        snapshot.city_index
+        snapshot.facets
+        snapshot.fragments.precompute(plans)
+        self._snapshot = snapshot
+        elapsed = time.perf_counter() - started
+        CATALOG_LOAD_SECONDS.observe(elapsed, source=origin)
+        if previous is not None:
+            CATALOG_RELOADS.inc(result='swapped')
+        CATALOG_PLANS.set(len(plans))
+        CATALOG_VERSION.set(version)
+        if previous is None or previous.entry_hashes is None:
+            logger.info('Loaded plan catalog v%s (%s plans) in %.1f ms', version, len(plans), elapsed * 1000)
+            return
+        changes = CatalogChanges.between(previous, plans, entry_hashes)
+        for change in ('added', 'updated', 'removed'):
+            CATALOG_PLAN_CHANGES.inc(getattr(changes, change), change=change)
+        logger.info(
+            'Loaded plan catalog v%s (%s plans; %s) in %.1f ms from %s',
+            version, len(plans), changes, elapsed * 1000, origin,
+        )
+
+    def _load_compiled(self, source_stat: tuple) -> Optional[tuple]:
+        if self.snapshot_path is None:
+            return None
+        loaded = load_snapshot(self.snapshot_path, self.path, source_stat)
+        if loaded is None:
+            return None
+        header, plans, index, entry_hashes = loaded
+        if header['mode'] != settings.PLAN_CATALOG_MODE:
+            index = build_plan_index(plans)
+        return plans, index, header['source_digest'], entry_hashes
+
+    def _start_watcher(self) -> None:
+        interval = self.check_interval
+        if interval is None:
+            interval = settings.PLAN_CATALOG_RELOAD_INTERVAL
+        if interval <= 0:
+            return
+        with self._watcher_lock:
+            if self._watcher is not None:
+                return
+            self._watcher = threading.Thread(
+                target=self._watch, args=(interval,), name='plan-catalog-watcher', daemon=True,
+            )
+            self._watcher.start()
+
+    def _watch(self, interval: float) -> None:
+        while True:
+            time.sleep(interval)
+            try:
+                self.check_for_update()
+            except Exception:
+                CATALOG_RELOADS.inc(result='failed')
+                logger.exception('Plan catalog reload failed; keeping the current snapshot')
+
+
+# Every live holder, so one fork hook can reset them all without keeping
+# holders from tests and commands alive.
+_holders = weakref.WeakSet()
+
+
+def _reset_holders_after_fork() -> None:
+    for holder in list(_holders):
+        holder._after_fork()
+
+
+os.register_at_fork(after_in_child=_reset_holders_after_fork)
+
+catalog_holder = CatalogHolder(snapshot_path=settings.PLAN_CATALOG_SNAPSHOT_PATH or None)
+
+
+def get_catalog_snapshot() -> CatalogSnapshot:
+    return catalog_holder.snapshot()
+
+
+@timed('catalog')
+def get_plan_source():
+    """
+    Return the catalog the views read from.
+
+    This is the current ``CatalogSnapshot``, or a ``DatabasePlanIndex`` when
+    ``PLAN_CATALOG_SOURCE`` is ``'database'``. Both expose ``plans``,
+    ``index``, ``version``, ``city_index``, ``facets``, ``fragments``,
+    ``cities()`` and ``lookup()``.
+    """
+    if settings.PLAN_CATALOG_SOURCE == 'database':
+        return DatabasePlanIndex()
+    return get_catalog_snapshot()
+
+
+class DatabasePlanSelection(Sequence):
+    """Lazy plan sequence over a ``Plan`` queryset; rows become records on slicing."""
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+        self._count = None
+
+    def __len__(self) -> int:
+        if self._count is None:
+            self._count = self.queryset.count()
+        return self._count
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [plan.to_record() for plan in self.queryset.with_relations()[position]]
+        return self.queryset.with_relations()[position].to_record()
+
+    def summarize(self) -> dict:
+        return self.queryset.summarize()
+
+    def top(self, field: str, limit: int) -> list:
+        return [plan.to_record() for plan in self.queryset.cheapest(field).with_relations()[:limit]]
+
+    def page(self, after: Optional[list], limit: int) -> list:
+        """``([position, id], plan)`` for up to ``limit`` rows after the key ``after``."""
+        plans = self.queryset.order_by('position', 'id')
+        if after is not None:
+            position, plan_id = (int(value) for value in after)
+            plans = plans.filter(Q(position__gt=position) | Q(position=position, id__gt=plan_id))
+        return [([plan.position, plan.id], plan.to_record()) for plan in plans.with_relations()[:limit]]
+
+
+# (version, CityIndex), (version, PlanFacets) and (version, PlanFragments) for
+# the Plan table, rebuilt when a plan write bumps the version.
+_database_city_index = None
+_database_facets = None
+_database_fragments = None
+
+
+class DatabasePlanIndex:
+    """Query engine that pushes plan filtering down to the ``Plan`` table."""
+
+    def __init__(self):
+        from .models import Plan
+
+        self.plans = DatabasePlanSelection(Plan.objects.all())
+        self._version = None
+
+    @property
+    def index(self) -> 'DatabasePlanIndex':
+        return self
+
+    @property
+    def version(self) -> int:
+        """
+        Identifies the Plan table's contents, the database counterpart of the snapshot version.
+
+        Derived from the latest plan write and the row count, so deletes change
+        it too; kept below 2**48 so JSON clients read it exactly.
+        """
+        if self._version is None:
+            state = self.plans.queryset.aggregate(latest=Max('updated_at'), count=Count('id'))
+            latest = state['latest'].isoformat() if state['latest'] else ''
+            digest = hashlib.blake2b(f"{latest}:{state['count']}".encode('ascii'), digest_size=6).digest()
+            self._version = int.from_bytes(digest, 'big')
+        return self._version
+
+    def age_bucket(self, age: int) -> int:
+        # Age boundaries would cost a query of their own; exact ages are still correct keys.
+        return age
+
+    def query(
+        self,
+        member: str,
+        age: Optional[int],
+        city: Optional[str],
+        max_deductible: Optional[int] = None,
+        max_oop: Optional[int] = None,
+    ) -> DatabasePlanSelection:
+        return DatabasePlanSelection(
+            self.plans.queryset.matching(member, age, city, max_deductible, max_oop),
+        )
+
+    @property
+    def city_index(self) -> CityIndex:
+        global _database_city_index
+        version = self.version
+        if _database_city_index is None or _database_city_index[0] != version:
+            from .models import City
+
+            cities = City.objects.annotate(plan_count=Count('plans')).filter(plan_count__gt=0)
+            counts = dict(cities.values_list('name', 'plan_count'))
+            _database_city_index = (version, CityIndex(counts))
+        return _database_city_index[1]
+
+    @property
+    def facets(self) -> PlanFacets:
+        global _database_facets
+        version = self.version
+        if _database_facets is None or _database_facets[0] != version:
+            from .models import Plan, PlanCity
+
+            # Only the faceted columns are read, as plain dicts.
+            fields = ('id', 'provider', 'age_min', 'age_max') + tuple(SEGMENT_FIELDS.values())
+            rows = {row['id']: dict(row, cities=[]) for row in Plan.objects.values(*fields)}
+            for plan_id, city in PlanCity.objects.values_list('plan_id', 'city__name'):
+                rows[plan_id]['cities'].append(city)
+            _database_facets = (version, PlanFacets(list(rows.values())))
+        return _database_facets[1]
+
+    @property
+    def fragments(self) -> PlanFragments:
+        global _database_fragments
+        version = self.version
+        if _database_fragments is None or _database_fragments[0] != version:
+            _database_fragments = (version, PlanFragments())
+        return _database_fragments[1]
+
+    def cities(self) -> list:
+        return self.city_index.cities
+
+    def lookup(self, slugs) -> list:
+        """Plans for ``slugs`` in the order given; unknown slugs are skipped."""
+        if not slugs:
+            return []
+        plans = {plan.slug: plan for plan in self.plans.queryset.filter(slug__in=slugs).with_relations()}
+        return [plans[slug].to_record() for slug in slugs if slug in plans]
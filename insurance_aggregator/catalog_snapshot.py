@@ -0,0 +1,106 @@
+"""
+Precompiled binary snapshot of the normalized plan catalog.
+
+The file starts with a one-line JSON header describing the snapshot format,
+the source feed and the classification rules it was built from, followed by
+a pickle of the plans, their query index and the content hash of each plan's
+feed entry. Workers read the header first and only memory-map and unpickle
+the body when it still matches the current source; otherwise the caller falls
+back to parsing ``plans.json``.
+"""
+
+import json
+import logging
+import mmap
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from .classification import get_classifier
+from .data_loader import file_digest
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b'insurance-buddy-catalog'
+SNAPSHOT_FORMAT = 4
+
+
+def write_snapshot(
+    path: Path,
+    plans: list,
+    index,
+    mode: str,
+    source_digest: str,
+    source_stat: tuple,
+    entry_hashes: list,
+) -> None:
+    """Atomically write a snapshot so concurrent readers never see a partial file."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    header = {
+        'format': SNAPSHOT_FORMAT,
+        'mode': mode,
+        'plans': len(plans),
+        'rules_digest': get_classifier().digest,
+        'source_digest': source_digest,
+        'source_mtime_ns': source_stat[0],
+        'source_size': source_stat[1],
+    }
+    descriptor, temp_name = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.')
+    try:
+        with os.fdopen(descriptor, 'wb') as target:
+            target.write(SNAPSHOT_MAGIC + b' ' + json.dumps(header).encode('ascii') + b'\n')
+            body = {'plans': plans, 'index': index, 'entry_hashes': entry_hashes}
+            pickle.dump(body, target, protocol=pickle.HIGHEST_PROTOCOL)
+        os.chmod(temp_name, 0o644)
+        os.replace(temp_name, path)
+    except BaseException:
+        Path(temp_name).unlink(missing_ok=True)
+        raise
+
+
+def read_header(path: Path) -> Optional[dict]:
+    try:
+        with Path(path).open('rb') as source:
+            line = source.readline()
+    except OSError:
+        return None
+    magic, _, payload = line.partition(b' ')
+    if magic != SNAPSHOT_MAGIC:
+        return None
+    try:
+        header = json.loads(payload)
+    except ValueError:
+        return None
+    header['body_offset'] = len(line)
+    return header
+
+
+def is_fresh(header: Optional[dict], source: Path, source_stat: tuple) -> bool:
+    if not header or header.get('format') != SNAPSHOT_FORMAT:
+        return False
+    if header.get('rules_digest') != get_classifier().digest:
+        return False
+    if header['source_size'] != source_stat[1]:
+        return False
+    if header['source_mtime_ns'] == source_stat[0]:
+        return True
+    # Deploys may rewrite mtimes; fall back to comparing content.
+    return header['source_digest'] == file_digest(source)
+
+
+def load_snapshot(path: Path, source: Path, source_stat: tuple) -> Optional[tuple]:
+    """Return ``(header, plans, index, entry_hashes)`` if the snapshot matches ``source``."""
+    header = read_header(path)
+    if not is_fresh(header, source, source_stat):
+        return None
+    try:
+        with Path(path).open('rb') as snapshot_file:
+            with mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                body = pickle.loads(memoryview(mapped)[header['body_offset']:])
+    except (OSError, ValueError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        logger.warning('Ignoring unreadable plan catalog snapshot at %s', path, exc_info=True)
+        return None
+    return header, body['plans'], body['index'], body['entry_hashes']
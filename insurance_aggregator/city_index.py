@@ -0,0 +1,191 @@
+"""
+Prefix index over the catalog's cities for autocomplete.
+
+Every word start of every city name ("new haven, ct", "haven, ct", "ct") is
+kept in one sorted list, so a prefix lookup is two bisections followed by a
+scan over just the matching keys. Results rank matches at the start of the
+name first, then by how many plans serve the city; ``search_counted`` ranks
+by a caller's filtered plan counts instead and drops cities with none. One
+index is built per catalog version and never changes afterwards.
+
+Free-text city input is resolved in two steps. The input is first
+normalized: case and punctuation are dropped and a spelled-out state becomes
+its postal code, so "new haven connecticut" matches "New Haven, CT" exactly.
+If that fails, a character trigram index scores every city that shares a
+trigram with the input, which absorbs typos and missing state suffixes. The
+scoring is one ``np.bincount`` over the input's posting arrays, so even tens
+of thousands of similar names ("Town 1", "Town 2", ...) resolve in well under
+a millisecond.
+"""
+
+import heapq
+import re
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+
+# Sorts after every character a folded city name can contain.
+_PREFIX_END = '\U0010ffff'
+
+# Lowest Dice similarity between trigram sets that still counts as a match.
+MIN_SIMILARITY = 0.45
+
+_NON_WORD = re.compile(r'[\W_]+')
+
+STATE_CODES = {
+    'alabama': 'al', 'alaska': 'ak', 'arizona': 'az', 'arkansas': 'ar', 'california': 'ca',
+    'colorado': 'co', 'connecticut': 'ct', 'delaware': 'de', 'district of columbia': 'dc',
+    'florida': 'fl', 'georgia': 'ga', 'hawaii': 'hi', 'idaho': 'id', 'illinois': 'il',
+    'indiana': 'in', 'iowa': 'ia', 'kansas': 'ks', 'kentucky': 'ky', 'louisiana': 'la',
+    'maine': 'me', 'maryland': 'md', 'massachusetts': 'ma', 'michigan': 'mi', 'minnesota': 'mn',
+    'mississippi': 'ms', 'missouri': 'mo', 'montana': 'mt', 'nebraska': 'ne', 'nevada': 'nv',
+    'new hampshire': 'nh', 'new jersey': 'nj', 'new mexico': 'nm', 'new york': 'ny',
+    'north carolina': 'nc', 'north dakota': 'nd', 'ohio': 'oh', 'oklahoma': 'ok', 'oregon': 'or',
+    'pennsylvania': 'pa', 'rhode island': 'ri', 'south carolina': 'sc', 'south dakota': 'sd',
+    'tennessee': 'tn', 'texas': 'tx', 'utah': 'ut', 'vermont': 'vt', 'virginia': 'va',
+    'washington': 'wa', 'west virginia': 'wv', 'wisconsin': 'wi', 'wyoming': 'wy',
+}
+
+
+def fold_city(value: str) -> str:
+    return ' '.join(value.casefold().split())
+
+
+def normalize_city(value: str) -> str:
+    """Lowercase words without punctuation, ending in a postal code when a state was spelled out."""
+    words = _NON_WORD.sub(' ', value.casefold()).split()
+    # Only a trailing state is folded: "New York, New York" -> "new york ny".
+    for size in (3, 2, 1):
+        if len(words) > size:
+            code = STATE_CODES.get(' '.join(words[-size:]))
+            if code:
+                words[-size:] = [code]
+                break
+    return ' '.join(words)
+
+
+def trigrams(normalized: str) -> set:
+    padded = f' {normalized} '
+    return {padded[position:position + 3] for position in range(len(padded) - 2)}
+
+
+class CityIndex:
+    def __init__(self, counts: dict, cache_size: int = 1024):
+        self.counts = counts
+        self.cities = sorted(counts)
+        keys = []
+        for city_id, city in enumerate(self.cities):
+            folded = fold_city(city)
+            for position in range(len(folded)):
+                if position == 0 or folded[position - 1] == ' ':
+                    keys.append((folded[position:], position > 0, city_id))
+        keys.sort()
+        self.keys = [key for key, _, _ in keys]
+        self.key_cities = [(inner, city_id) for _, inner, city_id in keys]
+        self.popular = sorted(range(len(self.cities)), key=lambda city_id: (-counts[self.cities[city_id]], city_id))
+        self.search = lru_cache(maxsize=cache_size)(self._search)
+
+        # Normalized names for exact resolution; on a collision the city with
+        # more plans wins because ``popular`` is walked in that order.
+        self.normalized = {}
+        postings = {}
+        gram_counts = [0] * len(self.cities)
+        for city_id in self.popular:
+            normalized = normalize_city(self.cities[city_id])
+            self.normalized.setdefault(normalized, city_id)
+            grams = trigrams(normalized)
+            gram_counts[city_id] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(city_id)
+        self.gram_postings = {gram: np.asarray(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self.gram_counts = np.asarray(gram_counts, dtype=np.float64)
+        self.plan_counts = np.asarray([counts[city] for city in self.cities], dtype=np.int64)
+        self.resolve = lru_cache(maxsize=cache_size)(self._resolve)
+
+    @classmethod
+    def from_plans(cls, plans) -> 'CityIndex':
+        counts = {}
+        for plan in plans:
+            for city in set(plan.get('cities', [])):
+                counts[city] = counts.get(city, 0) + 1
+        return cls(counts)
+
+    def __len__(self) -> int:
+        return len(self.cities)
+
+    def __contains__(self, city) -> bool:
+        return city in self.counts
+
+    def _prefix_matches(self, prefix: str) -> dict:
+        """``{city_id: inner}`` for cities with a word starting with ``prefix``; ``inner`` is false on a name-start hit."""
+        low = bisect_left(self.keys, prefix)
+        high = bisect_left(self.keys, prefix + _PREFIX_END, low)
+        best = {}
+        for inner, city_id in self.key_cities[low:high]:
+            # A city can match on several words; keep its best (name-start) hit.
+            if not inner or city_id not in best:
+                best[city_id] = inner
+        return best
+
+    def _search(self, query: str, limit: int = 10) -> list:
+        """Return up to ``limit`` ``(city, plan_count)`` pairs whose words start with ``query``."""
+        prefix = fold_city(query)
+        if not prefix:
+            ranked = self.popular[:limit]
+        else:
+            best = self._prefix_matches(prefix)
+            counts, cities = self.counts, self.cities
+            ranked = heapq.nsmallest(
+                limit,
+                best,
+                key=lambda city_id: (best[city_id], -counts[cities[city_id]], city_id),
+            )
+        return [(self.cities[city_id], self.counts[self.cities[city_id]]) for city_id in ranked]
+
+    def search_counted(self, query: str, count, limit: int = 10) -> list:
+        """``search`` with plan counts from ``count(city)`` instead of the catalog totals.
+
+        Matches are ranked by those counts and cities counted zero are left
+        out. An empty ``query`` is not handled here: every city would match,
+        so callers take the top cities from the facet counts instead.
+        """
+        best = self._prefix_matches(fold_city(query))
+        cities = self.cities
+        counted = {}
+        for city_id in best:
+            plan_count = count(cities[city_id])
+            if plan_count:
+                counted[city_id] = plan_count
+        ranked = heapq.nsmallest(
+            limit,
+            counted,
+            key=lambda city_id: (best[city_id], -counted[city_id], city_id),
+        )
+        return [(cities[city_id], counted[city_id]) for city_id in ranked]
+
+    def _resolve(self, query: str) -> Optional[str]:
+        """Return the catalog city ``query`` most likely means, or ``None``."""
+        if query in self.counts:
+            return query
+        normalized = normalize_city(query)
+        if not normalized:
+            return None
+        city_id = self.normalized.get(normalized)
+        if city_id is not None:
+            return self.cities[city_id]
+
+        grams = trigrams(normalized)
+        postings = [self.gram_postings[gram] for gram in grams if gram in self.gram_postings]
+        if not postings:
+            return None
+        shared = np.bincount(np.concatenate(postings), minlength=len(self.cities))
+        # Dice coefficient between the input's and each city's trigram sets.
+        similarity = 2 * shared / (len(grams) + self.gram_counts)
+        best_score = similarity.max()
+        if best_score < MIN_SIMILARITY:
+            return None
+        tied = np.flatnonzero(similarity == best_score)
+        # Ties go to the city with more plans, then the first alphabetically.
+        return self.cities[int(tied[np.argmax(self.plan_counts[tied])])]
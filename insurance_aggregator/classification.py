@@ -0,0 +1,142 @@
+"""
+Provider and name-tag classification driven by ``classification_rules.json``.
+
+Provider rules are case-sensitive substrings of the plan name before its first
+``(``; the first matching rule wins and otherwise the stripped prefix is the
+provider. Name-tag groups are lowercase keywords matched anywhere in the
+lowercased name; the first group with a hit supplies the tag, and a hit in any
+``government`` group marks the plan as a government program.
+
+Every rule literal is compiled into one Aho-Corasick automaton that is run once
+over ``prefix + NUL + name.lower()``. It reports every occurrence, so picking
+the lowest rule priority reproduces the ordered ``if`` chains exactly.
+"""
+
+import hashlib
+import json
+from collections import deque
+from functools import lru_cache
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+
+RULES_PATH = Path(settings.BASE_DIR) / 'insurance_aggregator' / 'static' / 'data' / 'classification_rules.json'
+
+PROVIDER = 'provider'
+KEYWORD = 'keyword'
+
+
+class Classification(NamedTuple):
+    provider: str
+    tag: Optional[str]
+    is_government: bool
+
+
+class Automaton:
+    """Aho-Corasick matcher over literal patterns, each carrying a payload."""
+
+    def __init__(self, patterns: dict):
+        self.transitions = [{}]
+        self.fail = [0]
+        self.outputs = [[]]
+        for literal, payloads in patterns.items():
+            if not literal:
+                continue
+            node = 0
+            for char in literal:
+                child = self.transitions[node].get(char)
+                if child is None:
+                    child = len(self.transitions)
+                    self.transitions[node][char] = child
+                    self.transitions.append({})
+                    self.fail.append(0)
+                    self.outputs.append([])
+                node = child
+            self.outputs[node].extend((len(literal), payload) for payload in payloads)
+
+        queue = deque(self.transitions[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.transitions[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and char not in self.transitions[fallback]:
+                    fallback = self.fail[fallback]
+                if node:
+                    self.fail[child] = self.transitions[fallback].get(char, 0)
+                self.outputs[child] = self.outputs[child] + self.outputs[self.fail[child]]
+
+    def iter_matches(self, text: str):
+        """Yield ``(start, payload)`` for every pattern occurrence in ``text``."""
+        transitions = self.transitions
+        node = 0
+        for position, char in enumerate(text):
+            while node and char not in transitions[node]:
+                node = self.fail[node]
+            node = transitions[node].get(char, 0)
+            for length, payload in self.outputs[node]:
+                yield position - length + 1, payload
+
+
+class PlanClassifier:
+    def __init__(self, rules: dict, digest: str = '', cache_size: int = 1 << 16):
+        self.digest = digest
+        self.tags = []
+        self.government_groups = set()
+        patterns = {}
+        for priority, rule in enumerate(rules.get('providers', [])):
+            patterns.setdefault(rule['match'], []).append((PROVIDER, priority, rule['provider']))
+        for group, rule in enumerate(rules.get('name_tags', [])):
+            self.tags.append(rule['tag'])
+            if rule.get('government'):
+                self.government_groups.add(group)
+            for keyword in rule['keywords']:
+                patterns.setdefault(keyword, []).append((KEYWORD, group, None))
+        self.automaton = Automaton(patterns)
+        self.classify = lru_cache(maxsize=cache_size)(self._classify)
+
+    def _classify(self, plan_name: str) -> Classification:
+        if not plan_name:
+            return Classification('', None, False)
+        prefix = plan_name.split('(')[0].strip()
+        split = len(prefix)
+        provider_match = None
+        tag_group = None
+        is_government = False
+        for start, (kind, rank, label) in self.automaton.iter_matches(prefix + '\0' + plan_name.lower()):
+            if kind == PROVIDER:
+                # Literals cannot span the NUL separator, so any provider hit
+                # starting inside the prefix lies entirely within it.
+                if start < split and (provider_match is None or rank < provider_match[0]):
+                    provider_match = (rank, label)
+            elif start > split:
+                if tag_group is None or rank < tag_group:
+                    tag_group = rank
+                if rank in self.government_groups:
+                    is_government = True
+        return Classification(
+            provider_match[1] if provider_match else prefix,
+            self.tags[tag_group] if tag_group is not None else None,
+            is_government,
+        )
+
+
+def load_classifier(path: Path = RULES_PATH) -> PlanClassifier:
+    payload = Path(path).read_bytes()
+    return PlanClassifier(json.loads(payload), hashlib.sha256(payload).hexdigest())
+
+
+_loaded = {}
+
+
+def get_classifier(path: Path = RULES_PATH) -> PlanClassifier:
+    """Return the classifier for the rules file, recompiling it when the file changes."""
+    stat = Path(path).stat()
+    key = (str(path), stat.st_mtime_ns, stat.st_size)
+    classifier = _loaded.get(key)
+    if classifier is None:
+        classifier = load_classifier(path)
+        _loaded.clear()
+        _loaded[key] = classifier
+    return classifier
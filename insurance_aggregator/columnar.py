@@ -0,0 +1,159 @@
+"""
+Columnar, NumPy-backed view of the normalized plan catalog.
+
+Filtering is a boolean-mask expression over per-field arrays and the
+``summarize_plans`` counts are mask reductions. The dict rows used by the
+templates are only gathered for the positions a caller actually reads.
+"""
+
+from collections.abc import Sequence
+from typing import Optional
+
+import numpy as np
+
+from .plan_index import COST_FIELDS, SEGMENT_FIELDS, cost_order, plan_age_bounds
+
+
+class ColumnarCatalog:
+    def __init__(self, plans: list):
+        self.plans = plans
+        size = len(plans)
+        self.size = size
+
+        bounds = [plan_age_bounds(plan) for plan in plans]
+        self.age_min = np.fromiter((low for low, _ in bounds), dtype=np.int32, count=size)
+        self.age_max = np.fromiter((high for _, high in bounds), dtype=np.int32, count=size)
+        valid = self.age_min <= self.age_max
+        self.age_boundaries = np.unique(np.concatenate((self.age_min[valid], self.age_max[valid] + 1)))
+        self.flags = {
+            field: np.fromiter((bool(plan.get(field)) for plan in plans), dtype=bool, count=size)
+            for field in ('for_child', 'for_adult', 'supports_family', 'is_government')
+        }
+
+        # Cost columns: unparseable amounts are flagged in ``cost_known``.
+        self.costs = {}
+        self.cost_known = {}
+        self.cost_orders = {}
+        for field in COST_FIELDS:
+            amounts = [plan.get(field) for plan in plans]
+            self.cost_known[field] = np.fromiter((amount is not None for amount in amounts), dtype=bool, count=size)
+            self.costs[field] = np.fromiter((amount or 0 for amount in amounts), dtype=np.int64, count=size)
+            self.cost_orders[field] = np.asarray(cost_order(plans, field), dtype=np.int64)
+
+        # Provider as categorical codes; code -1 marks a plan without provider.
+        self.provider_labels = sorted({plan['provider'] for plan in plans if plan.get('provider')})
+        provider_codes = {label: code for code, label in enumerate(self.provider_labels)}
+        self.provider_codes = np.fromiter(
+            (provider_codes.get(plan.get('provider'), -1) for plan in plans),
+            dtype=np.int32,
+            count=size,
+        )
+
+        # City membership as a sparse plan x city matrix in CSR form, plus the
+        # CSC transpose so a single city's plans are one contiguous slice.
+        self.city_labels = sorted({city for plan in plans for city in plan.get('cities', [])})
+        self.city_codes = {label: code for code, label in enumerate(self.city_labels)}
+        lengths = np.fromiter((len(plan.get('cities', [])) for plan in plans), dtype=np.int64, count=size)
+        self.city_indptr = np.concatenate(([0], np.cumsum(lengths)))
+        self.city_indices = np.fromiter(
+            (self.city_codes[city] for plan in plans for city in plan.get('cities', [])),
+            dtype=np.int32,
+            count=int(self.city_indptr[-1]),
+        )
+        self.city_rows = np.repeat(np.arange(size, dtype=np.int64), lengths)
+        order = np.argsort(self.city_indices, kind='stable')
+        self._city_plan_ids = self.city_rows[order]
+        self._city_offsets = np.searchsorted(
+            self.city_indices[order], np.arange(len(self.city_labels) + 1),
+        )
+
+    def __len__(self) -> int:
+        return self.size
+
+    def age_bucket(self, age: int) -> int:
+        """Elementary age interval holding ``age``; ages in one bucket match the same plans."""
+        return int(np.searchsorted(self.age_boundaries, age, side='right'))
+
+    def city_mask(self, city: str) -> np.ndarray:
+        mask = np.zeros(self.size, dtype=bool)
+        code = self.city_codes.get(city)
+        if code is not None:
+            mask[self._city_plan_ids[self._city_offsets[code]:self._city_offsets[code + 1]]] = True
+        return mask
+
+    def mask(
+        self,
+        member: str,
+        age: Optional[int],
+        city: Optional[str],
+        max_deductible: Optional[int] = None,
+        max_oop: Optional[int] = None,
+    ) -> np.ndarray:
+        field = SEGMENT_FIELDS.get(member)
+        mask = self.flags[field].copy() if field else np.ones(self.size, dtype=bool)
+        if city:
+            mask &= self.city_mask(city)
+        if age is not None:
+            mask &= (self.age_min <= age) & (self.age_max >= age)
+        for cost_field, limit in (('deductible_amount', max_deductible), ('oop_amount', max_oop)):
+            if limit is not None:
+                mask &= self.cost_known[cost_field] & (self.costs[cost_field] <= limit)
+        return mask
+
+    def query(
+        self,
+        member: str,
+        age: Optional[int],
+        city: Optional[str],
+        max_deductible: Optional[int] = None,
+        max_oop: Optional[int] = None,
+    ) -> 'ColumnarSelection':
+        return ColumnarSelection(self, self.mask(member, age, city, max_deductible, max_oop))
+
+    def top(self, mask: np.ndarray, field: str, limit: int) -> list:
+        order = self.cost_orders[field]
+        return [self.plans[plan_id] for plan_id in order[mask[order]][:limit].tolist()]
+
+    def summarize(self, mask: np.ndarray) -> dict:
+        plan_count = int(mask.sum())
+        if not plan_count:
+            return {'plan_count': 0, 'provider_count': 0, 'city_count': 0, 'child_ready': 0, 'adult_ready': 0}
+        provider_codes = self.provider_codes[mask]
+        city_codes = self.city_indices[mask[self.city_rows]]
+        return {
+            'plan_count': plan_count,
+            'provider_count': int(np.unique(provider_codes[provider_codes >= 0]).size),
+            'city_count': int(np.unique(city_codes).size) or 1,
+            'child_ready': int((self.flags['for_child'] & mask).sum()),
+            'adult_ready': int((self.flags['for_adult'] & mask).sum()),
+        }
+
+
+class ColumnarSelection(Sequence):
+    """Lazy sequence of the plans selected by a mask, in catalog order."""
+
+    def __init__(self, catalog: ColumnarCatalog, mask: np.ndarray):
+        self.catalog = catalog
+        self.mask = mask
+        self.plan_ids = np.flatnonzero(mask)
+
+    def __len__(self) -> int:
+        return len(self.plan_ids)
+
+    def __getitem__(self, position):
+        plans = self.catalog.plans
+        if isinstance(position, slice):
+            return [plans[plan_id] for plan_id in self.plan_ids[position].tolist()]
+        return plans[int(self.plan_ids[position])]
+
+    def summarize(self) -> dict:
+        return self.catalog.summarize(self.mask)
+
+    def top(self, field: str, limit: int) -> list:
+        return self.catalog.top(self.mask, field, limit)
+
+    def page(self, after: Optional[int], limit: int) -> list:
+        """``(plan_id, plan)`` for up to ``limit`` matches after plan id ``after``."""
+        start = 0 if after is None else int(np.searchsorted(self.plan_ids, int(after), side='right'))
+        plans = self.catalog.plans
+        return [(plan_id, plans[plan_id]) for plan_id in self.plan_ids[start:start + limit].tolist()]
@@ -1,15 +1,38 @@
+import codecs
+import hashlib
+import heapq
 import json
 import re
-from functools import lru_cache
+import sys
+from collections import Counter
+from itertools import islice
 from pathlib import Path
 from typing import Optional
 
 from django.conf import settings
+from django.utils.text import slugify
+
+from .classification import get_classifier
+from .metrics import DATA_LOADER_SECONDS
+from .timing import timed
 
 DATA_PATH = Path(settings.BASE_DIR) / 'insurance_aggregator' / 'static' / 'data' / 'plans.json'
 
 CONTENT_REF_PATTERN = re.compile(r':contentReference\[[^\]]+\]\{[^}]+\}')
 
+# Cost text usually leads with the headline (in-network) amount, e.g.
+# "$1,000 per person" or "$0 in-network ($500 out-of-network)".
+LEADING_AMOUNT_PATTERN = re.compile(r'^\$\s?(\d[\d,]*)(?:\.\d+)?')
+
+# Sortable cost columns: query value -> numeric field parsed at ingestion.
+COST_SORT_FIELDS = {
+    'deductible': 'deductible_amount',
+    'oop': 'oop_amount',
+}
+
+# Characters of the slugified plan name kept in a plan's slug.
+SLUG_NAME_LENGTH = 60
+
 FIELD_MAP = {
     'plan_name': 'plan_name',
     'overall-deductible': 'overall_deductible',
@@ -28,13 +51,169 @@ FIELD_MAP = {
     'for-adult': 'for_adult',
 }
 
-GOVERNMENT_KEYWORDS = (
-    'medicaid',
-    'chip',
-    'medicare',
-    'tricare',
-    'husky',
-)
+
+def iter_raw_entries(source=DATA_PATH, chunk_size: int = 1 << 16, with_text: bool = False):
+    """
+    Yield raw plan entries one at a time from a JSON array or an NDJSON feed.
+
+    ``source`` is a path or an open text stream. Only one chunk plus the entry
+    being decoded is held in memory, so peak memory does not grow with the
+    feed size. With ``with_text``, each entry comes as ``(text, entry)``,
+    where ``text`` is the entry exactly as written in the feed.
+    """
+    if isinstance(source, (str, Path)):
+        with Path(source).open(encoding='utf-8') as stream:
+            yield from _iter_json_values(stream, chunk_size, str(source), with_text)
+    else:
+        yield from _iter_json_values(source, chunk_size, getattr(source, 'name', '<plan feed>'), with_text)
+
+
+def _iter_json_values(stream, chunk_size: int, label: str, with_text: bool = False):
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    eof = False
+    # None until the first value: True for a top-level array, False for NDJSON.
+    in_array = None
+
+    def fill() -> bool:
+        nonlocal buffer, position, eof
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            eof = True
+            return False
+        buffer = buffer[position:] + chunk
+        position = 0
+        return True
+
+    while True:
+        while position < len(buffer) and (buffer[position].isspace() or (in_array and buffer[position] == ',')):
+            position += 1
+        if position >= len(buffer):
+            if fill():
+                continue
+            if in_array:
+                raise ValueError(f'{label}: unexpected end of plan feed')
+            return
+        if in_array is None:
+            in_array = buffer[position] == '['
+            if in_array:
+                position += 1
+                continue
+        if in_array and buffer[position] == ']':
+            return
+        try:
+            entry, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if not eof and fill():
+                continue
+            raise
+        if end == len(buffer) and not eof and fill():
+            # A value ending exactly at the buffer edge may be truncated.
+            continue
+        if with_text:
+            yield buffer[position:end], entry
+        else:
+            yield entry
+        position = end
+
+
+class HashingReader:
+    """Text stream over a binary file that hashes the raw bytes as they are read."""
+
+    def __init__(self, binary):
+        self.name = getattr(binary, 'name', '<plan feed>')
+        self._binary = binary
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._hash = hashlib.sha256()
+
+    def read(self, size: int = -1) -> str:
+        while True:
+            data = self._binary.read(size)
+            self._hash.update(data)
+            text = self._decoder.decode(data, final=not data)
+            if text or not data:
+                return text
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+def file_digest(path: Path, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with Path(path).open('rb') as binary:
+        for chunk in iter(lambda: binary.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def iter_normalized_plans(source=DATA_PATH, chunk_size: int = 1 << 16):
+    """Yield normalized entries with feed-unique slugs, numbered like the in-memory catalog's."""
+    classifier = get_classifier()
+    slugs = set()
+    for entry in iter_raw_entries(source, chunk_size):
+        normalized = normalize_entry(entry, classifier)
+        normalized['slug'] = _unique_slug(normalized['slug'], slugs)
+        yield normalized
+
+
+def entry_hash(text: str) -> bytes:
+    """Content hash of one raw feed entry, as written in the feed."""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+
+def iter_plan_records(source=DATA_PATH, intern=None, reuse: Optional[dict] = None):
+    """
+    Yield ``(entry_hash, record)`` for each entry of the feed.
+
+    ``reuse`` maps entry hashes of an earlier build, made with the same
+    classification rules, to its records (see ``reusable_records``). An entry
+    whose hash is found there keeps that record instead of being normalized
+    again, so a reload only pays for added and edited entries.
+    """
+    intern = intern or StringInterner()
+    classifier = get_classifier()
+    reuse = reuse or {}
+    slugs = set()
+    for text, entry in iter_raw_entries(source, with_text=True):
+        digest = entry_hash(text)
+        record = reuse.get(digest)
+        if record is None or record.slug in slugs:
+            # New or edited entry, or a repeated name that now needs a numbered slug.
+            normalized = normalize_entry(entry, classifier)
+            normalized['slug'] = _unique_slug(normalized['slug'], slugs)
+            record = PlanRecord.from_dict(normalized, intern)
+        else:
+            slugs.add(record.slug)
+        yield digest, record
+
+
+def reusable_records(plans: list, entry_hashes: list) -> dict:
+    """Entry hash -> record for the plans of an earlier build that can be reused as-is."""
+    names = Counter(plan.plan_name for plan in plans)
+    # Repeated names got numbered slugs that depend on feed order; those are renormalized.
+    return {digest: plan for digest, plan in zip(entry_hashes, plans) if names[plan.plan_name] == 1}
+
+
+def plan_slug(plan_name: str) -> str:
+    """
+    Stable id for a plan in URLs: its slugified name and a short hash of the name.
+
+    The hash keeps names that slugify alike ("A & B", "A-B") apart. The slug
+    only changes when the plan is renamed, not when its costs are edited.
+    """
+    base = slugify(plan_name)[:SLUG_NAME_LENGTH].strip('-') or 'plan'
+    return f"{base}-{hashlib.sha256(plan_name.encode('utf-8')).hexdigest()[:8]}"
+
+
+def _unique_slug(slug: str, seen: set) -> str:
+    # Only a feed listing the same plan name twice gets here; later copies are numbered.
+    candidate, number = slug, 1
+    while candidate in seen:
+        number += 1
+        candidate = f'{slug}-{number}'
+    seen.add(candidate)
+    return candidate
 
 
 def _clean_value(value):
@@ -44,52 +223,22 @@ def _clean_value(value):
     return value
 
 
-def _derive_provider(plan_name: str) -> str:
-    if not plan_name:
-        return ''
-    provider = plan_name.split('(')[0].strip()
-    if 'Student Medicover' in provider:
-        return 'Student Medicover'
-    if 'WorldTrips' in provider:
-        return 'WorldTrips'
-    if 'ISO ' in provider:
-        return 'ISO International'
-    if 'IMG ' in provider:
-        return 'IMG Global'
-    if 'ACA Marketplace' in provider:
-        return 'ACA Marketplace'
-    if "Parent's Employer" in provider:
-        return "Parent Employer Plan"
-    if 'Compass' in provider:
-        return 'Compass Student'
-    if 'PSI ' in provider:
-        return 'PSI'
-    if 'TRICARE' in provider:
-        return 'TRICARE'
-    if 'Cigna' in provider:
-        return 'Cigna Global'
-    if 'SafetyWing' in provider:
-        return 'SafetyWing'
-    if 'Wellfleet' in provider:
-        return 'Wellfleet'
-    if 'Anthem' in provider:
-        return 'Anthem'
-    if 'UnitedHealthcare' in provider:
-        return 'UnitedHealthcare'
-    if 'Aetna' in provider:
-        return 'Aetna'
-    if 'Florida Blue' in provider:
-        return 'Florida Blue'
-    if 'ConnectiCare' in provider:
-        return 'ConnectiCare'
-    if "Spouse/Partner" in provider:
-        return 'Employer Plan'
-    if 'GeoBlue' in provider:
-        return 'GeoBlue'
-    return provider
-
-
-def _derive_tags(plan: dict) -> list:
+def parse_cost_amount(value) -> Optional[int]:
+    """Return the leading dollar amount of a cost field, or ``None`` if it has none."""
+    if not isinstance(value, str):
+        return None
+    match = LEADING_AMOUNT_PATTERN.match(value.strip())
+    if not match:
+        return None
+    return int(match.group(1).replace(',', ''))
+
+
+def cost_sort_key(plan, field: str) -> tuple:
+    amount = plan.get(field)
+    return (amount is None, amount or 0)
+
+
+def _derive_tags(plan: dict, classifier=None) -> list:
     tags = []
     if plan.get('for_child') and plan.get('for_adult'):
         tags.append('Family-ready')
@@ -106,50 +255,146 @@ def _derive_tags(plan: dict) -> list:
     if plan.get('network_lower_cost'):
         tags.append('Best in-network pricing')
 
-    provider = plan.get('provider', '').lower()
-    name = plan.get('plan_name', '').lower()
-    if any(keyword in name for keyword in GOVERNMENT_KEYWORDS):
-        tags.append('Government program')
-    elif 'aca' in name:
-        tags.append('ACA compliant')
-    elif 'exchange' in name or 'marketplace' in name:
-        tags.append('Marketplace ready')
-    elif 'nomad' in name or 'global' in name:
-        tags.append('Global coverage')
+    name_tag = (classifier or get_classifier()).classify(plan.get('plan_name', '')).tag
+    if name_tag:
+        tags.append(name_tag)
 
     return tags
 
 
-@lru_cache(maxsize=1)
-def load_plan_catalog() -> list:
-    with DATA_PATH.open() as source:
-        raw = json.load(source)
-
-    catalog = []
-    for entry in raw:
-        normalized = {}
-        for raw_key, field_key in FIELD_MAP.items():
-            if raw_key in entry:
-                normalized[field_key] = _clean_value(entry[raw_key])
-        normalized['plan_name'] = _clean_value(entry.get('plan_name')) or 'Unnamed Plan'
-        normalized['provider'] = _derive_provider(normalized['plan_name'])
-        normalized['cities'] = normalized.get('cities', []) or []
-        normalized['for_child'] = bool(normalized.get('for_child'))
-        normalized['for_adult'] = bool(normalized.get('for_adult'))
-        normalized['supports_family'] = normalized['for_child'] and normalized['for_adult']
-        normalized['is_government'] = any(
-            keyword in normalized['plan_name'].lower()
-            for keyword in GOVERNMENT_KEYWORDS
-        )
-        normalized['audience_label'] = _build_audience_label(normalized)
-        normalized['tags'] = _derive_tags(normalized)
-        normalized['cities_display'] = ', '.join(normalized['cities'])
-        catalog.append(normalized)
-
-    return catalog
-
-
-def _build_audience_label(plan: dict) -> str:
+class StringInterner:
+    """Share one object per distinct string or tuple across a catalog build."""
+
+    def __init__(self):
+        self._pool = {}
+
+    def __call__(self, value):
+        if isinstance(value, str):
+            return sys.intern(value)
+        if isinstance(value, (list, tuple)):
+            value = tuple(self(item) for item in value)
+            return self._pool.setdefault(value, value)
+        return value
+
+
+class PlanRecord:
+    """
+    Immutable, slotted normalized plan.
+
+    Supports ``plan['key']`` and ``plan.get('key')`` so templates and callers
+    written against the dict catalog keep working. Display-only fields are
+    derived on access instead of being stored per plan.
+    """
+
+    __slots__ = (
+        'plan_name',
+        'slug',
+        'provider',
+        'overall_deductible',
+        'services_before_deductible',
+        'specific_service_deductible',
+        'oop_individual',
+        'oop_family',
+        'oop_hospital',
+        'excluded_from_oop',
+        'network_lower_cost',
+        'referral_required',
+        'cities',
+        'age_min',
+        'age_max',
+        'for_child',
+        'for_adult',
+        'supports_family',
+        'is_government',
+        'tags',
+        'deductible_amount',
+        'oop_amount',
+    )
+    DISPLAY_FIELDS = ('audience_label', 'cities_display')
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            object.__setattr__(self, name, fields.get(name))
+
+    @classmethod
+    def from_dict(cls, normalized: dict, intern=None) -> 'PlanRecord':
+        intern = intern or StringInterner()
+        return cls(**{key: intern(value) for key, value in normalized.items()})
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __getitem__(self, key):
+        if key in self.__slots__ or key in self.DISPLAY_FIELDS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self.__slots__ or key in self.DISPLAY_FIELDS
+
+    def get(self, key, default=None):
+        try:
+            value = self[key]
+        except KeyError:
+            return default
+        return default if value is None else value
+
+    def as_dict(self) -> dict:
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data.update((name, getattr(self, name)) for name in self.DISPLAY_FIELDS)
+        return data
+
+    @property
+    def audience_label(self) -> str:
+        return _build_audience_label(self)
+
+    @property
+    def cities_display(self) -> str:
+        return ', '.join(self.cities)
+
+    def __reduce__(self):
+        return (_restore_plan_record, tuple(getattr(self, name) for name in self.__slots__))
+
+    def __repr__(self):
+        return f'<PlanRecord {self.plan_name!r}>'
+
+
+def _restore_plan_record(*values) -> PlanRecord:
+    return PlanRecord(**dict(zip(PlanRecord.__slots__, values)))
+
+
+def normalize_entry(entry: dict, classifier=None) -> dict:
+    classifier = classifier or get_classifier()
+    normalized = {}
+    for raw_key, field_key in FIELD_MAP.items():
+        if raw_key in entry:
+            normalized[field_key] = _clean_value(entry[raw_key])
+    normalized['plan_name'] = _clean_value(entry.get('plan_name')) or 'Unnamed Plan'
+    normalized['slug'] = plan_slug(normalized['plan_name'])
+    classification = classifier.classify(normalized['plan_name'])
+    normalized['provider'] = classification.provider
+    normalized['cities'] = normalized.get('cities', []) or []
+    normalized['for_child'] = bool(normalized.get('for_child'))
+    normalized['for_adult'] = bool(normalized.get('for_adult'))
+    normalized['supports_family'] = normalized['for_child'] and normalized['for_adult']
+    normalized['is_government'] = classification.is_government
+    normalized['tags'] = _derive_tags(normalized, classifier)
+    # ``None`` flags a cost we could not parse ("No fixed maximum", "N/A").
+    normalized['deductible_amount'] = parse_cost_amount(normalized.get('overall_deductible'))
+    normalized['oop_amount'] = parse_cost_amount(normalized.get('oop_individual'))
+    return normalized
+
+
+def build_plan_records(entries, intern=None) -> list:
+    intern = intern or StringInterner()
+    classifier = get_classifier()
+    return [PlanRecord.from_dict(normalize_entry(entry, classifier), intern) for entry in entries]
+
+
+def _build_audience_label(plan) -> str:
     if plan['for_child'] and plan['for_adult']:
         return 'All ages'
     if plan['for_child']:
@@ -164,7 +409,20 @@ def get_unique_cities(plans: list) -> list:
     return sorted(cities)
 
 
-def filter_plans(plans: list, member: str, age: Optional[int], city: Optional[str]) -> list:
+@timed('filter')
+@DATA_LOADER_SECONDS.time(function='filter_plans')
+def filter_plans(
+    plans: list,
+    member: str,
+    age: Optional[int],
+    city: Optional[str],
+    index=None,
+    max_deductible: Optional[int] = None,
+    max_oop: Optional[int] = None,
+):
+    if index is not None and index.plans is plans:
+        return index.query(member, age, city, max_deductible, max_oop)
+
     def supports_member(plan: dict) -> bool:
         if member == 'adult':
             return plan['for_adult']
@@ -176,6 +434,9 @@ def filter_plans(plans: list, member: str, age: Optional[int], city: Optional[st
             return plan['is_government']
         return True
 
+    def within(amount: Optional[int], limit: Optional[int]) -> bool:
+        return limit is None or (amount is not None and amount <= limit)
+
     filtered = []
     for plan in plans:
         if city and city not in plan.get('cities', []):
@@ -187,11 +448,46 @@ def filter_plans(plans: list, member: str, age: Optional[int], city: Optional[st
             max_age = plan.get('age_max') if isinstance(plan.get('age_max'), int) else 120
             if not (min_age <= age <= max_age):
                 continue
+        if not within(plan.get('deductible_amount'), max_deductible):
+            continue
+        if not within(plan.get('oop_amount'), max_oop):
+            continue
         filtered.append(plan)
     return filtered
 
 
-def summarize_plans(plans: list) -> dict:
+@timed('top')
+@DATA_LOADER_SECONDS.time(function='top_plans')
+def top_plans(plans, sort: Optional[str], limit: int) -> list:
+    """Return the first ``limit`` plans, cheapest first when ``sort`` names a cost."""
+    field = COST_SORT_FIELDS.get(sort)
+    if field is None:
+        return list(plans[:limit])
+    if hasattr(plans, 'top'):
+        return plans.top(field, limit)
+    # nsmallest is stable, so ties keep catalog order like the precomputed orders.
+    return heapq.nsmallest(limit, plans, key=lambda plan: cost_sort_key(plan, field))
+
+
+@timed('page')
+@DATA_LOADER_SECONDS.time(function='page_plans')
+def page_plans(plans, after, limit: int) -> list:
+    """Return ``(key, plan)`` pairs for up to ``limit`` plans following the key ``after``.
+
+    Engines key their pages on a stable catalog position, so a page costs the
+    same however deep it is; plain lists fall back to list positions.
+    """
+    if hasattr(plans, 'page'):
+        return plans.page(after, limit)
+    start = 0 if after is None else int(after) + 1
+    return list(islice(enumerate(plans), start, start + limit))
+
+
+@timed('summary')
+@DATA_LOADER_SECONDS.time(function='summarize_plans')
+def summarize_plans(plans) -> dict:
+    if hasattr(plans, 'summarize'):
+        return plans.summarize()
     if not plans:
         return {'plan_count': 0, 'provider_count': 0, 'city_count': 0, 'child_ready': 0, 'adult_ready': 0}
     providers = {plan['provider'] for plan in plans if plan.get('provider')}
@@ -0,0 +1,185 @@
+"""
+Facet counts for the plan builder, precomputed once per catalog version.
+
+Every (member, age bucket, city) cell holds the numbers ``summarize_plans``
+would report for that filter, except ``city_count``: a cell with a city
+selected counts that city alone, not every city its plans also serve. The
+product page summary and the result count next to each member option or city
+are array lookups. Age buckets are the catalog's elementary age intervals, the
+same ones the query engines key their caches on; an extra "any" slot on the
+member, age and city axes covers a filter left open.
+
+Counts are built with a running sum over age buckets: a plan adds one where
+its age range starts and removes one past its end. Distinct providers use
+the same sweep over (city, provider) coverage, counting a provider when it
+gains its first plan in a cell and dropping it when it loses its last.
+
+Cost limits are not part of the cells; a request that sets one is still
+summarized from its selection.
+"""
+
+from typing import Optional
+
+import numpy as np
+
+from .plan_index import SEGMENT_FIELDS, plan_age_bounds
+
+# '' is the "any member" slot and also covers segments the engines do not filter on.
+FACET_MEMBERS = ('',) + tuple(SEGMENT_FIELDS)
+
+EMPTY_SUMMARY = {'plan_count': 0, 'provider_count': 0, 'city_count': 0, 'child_ready': 0, 'adult_ready': 0}
+
+
+class PlanFacets:
+    def __init__(self, plans):
+        size = len(plans)
+        bounds = [plan_age_bounds(plan) for plan in plans]
+        age_min = np.fromiter((low for low, _ in bounds), dtype=np.int64, count=size)
+        age_max = np.fromiter((high for _, high in bounds), dtype=np.int64, count=size)
+        valid = age_min <= age_max
+        self.age_boundaries = np.unique(np.concatenate((age_min[valid], age_max[valid] + 1)))
+
+        self.cities = sorted({city for plan in plans for city in plan.get('cities', [])})
+        self.city_codes = {city: code for code, city in enumerate(self.cities)}
+        providers = sorted({plan['provider'] for plan in plans if plan.get('provider')})
+        provider_codes = {provider: code for code, provider in enumerate(providers)}
+        self.member_codes = {member: code for code, member in enumerate(FACET_MEMBERS)}
+
+        # One row per (plan, city) pair plus one per plan for the "any city" column.
+        lengths = np.fromiter((len(plan.get('cities', [])) for plan in plans), dtype=np.int64, count=size)
+        any_city = len(self.cities)
+        self._rows = np.concatenate((np.repeat(np.arange(size), lengths), np.arange(size)))
+        self._cols = np.concatenate((
+            np.fromiter(
+                (self.city_codes[city] for plan in plans for city in plan.get('cities', [])),
+                dtype=np.int64,
+                count=int(lengths.sum()),
+            ),
+            np.full(size, any_city, dtype=np.int64),
+        ))
+        self._valid = valid
+        self._start = np.searchsorted(self.age_boundaries, age_min, side='right')
+        self._end = np.searchsorted(self.age_boundaries, age_max + 1, side='right')
+        self._members = [np.ones(size, dtype=bool)] + [
+            np.fromiter((bool(plan.get(field)) for plan in plans), dtype=bool, count=size)
+            for field in SEGMENT_FIELDS.values()
+        ]
+        self._providers = np.fromiter(
+            (provider_codes.get(plan.get('provider'), -1) for plan in plans), dtype=np.int64, count=size,
+        )
+        self._provider_total = len(providers)
+
+        self.plan_counts = self._count(np.ones(size, dtype=bool))
+        self.child_ready = self._count(self._members[self.member_codes['child']])
+        self.adult_ready = self._count(self._members[self.member_codes['adult']])
+        self.provider_counts = self._count_providers()
+        self.city_counts = (self.plan_counts[:, :, :any_city] > 0).sum(axis=2)
+        del self._rows, self._cols, self._valid, self._start, self._end, self._members, self._providers
+
+    @property
+    def any_age(self) -> int:
+        return len(self.age_boundaries) + 1
+
+    def age_bucket(self, age: Optional[int]) -> int:
+        if age is None:
+            return self.any_age
+        return int(np.searchsorted(self.age_boundaries, age, side='right'))
+
+    def _shape(self) -> tuple:
+        return len(FACET_MEMBERS), self.any_age + 1, len(self.cities) + 1
+
+    def _sweep(self, buckets: np.ndarray, cities: np.ndarray, deltas) -> np.ndarray:
+        """Running sum over age buckets of ``deltas`` placed at ``(bucket, city)``."""
+        width = len(self.cities) + 1
+        placed = np.bincount(buckets * width + cities, weights=deltas, minlength=self.any_age * width)
+        return np.cumsum(np.rint(placed).astype(np.int64).reshape(self.any_age, width), axis=0)
+
+    def _count(self, plan_mask: np.ndarray) -> np.ndarray:
+        """Plans in ``plan_mask`` per (member, age bucket, city)."""
+        counts = np.zeros(self._shape(), dtype=np.int32)
+        rows, cols = self._rows, self._cols
+        for member, member_mask in enumerate(self._members):
+            chosen = (member_mask & plan_mask)[rows]
+            plan_ids, cities = rows[chosen], cols[chosen]
+            counts[member, self.any_age] = np.bincount(cities, minlength=len(self.cities) + 1)
+            ranged = self._valid[plan_ids]
+            plan_ids, cities = plan_ids[ranged], cities[ranged]
+            ones = np.ones(len(plan_ids))
+            counts[member, :self.any_age] = self._sweep(
+                np.concatenate((self._start[plan_ids], self._end[plan_ids])),
+                np.concatenate((cities, cities)),
+                np.concatenate((ones, -ones)),
+            )
+        return counts
+
+    def _count_providers(self) -> np.ndarray:
+        """Distinct providers per (member, age bucket, city)."""
+        counts = np.zeros(self._shape(), dtype=np.int32)
+        rows, cols = self._rows, self._cols
+        providers = max(self._provider_total, 1)
+        buckets = self.any_age
+        for member, member_mask in enumerate(self._members):
+            chosen = (member_mask & (self._providers >= 0))[rows]
+            plan_ids, cities = rows[chosen], cols[chosen]
+            groups = cities * providers + self._providers[plan_ids]
+            counts[member, buckets] = np.bincount(np.unique(groups) // providers, minlength=len(self.cities) + 1)
+
+            ranged = self._valid[plan_ids]
+            plan_ids, groups = plan_ids[ranged], groups[ranged]
+            # Starts sort ahead of ends in the same bucket, so a provider handing
+            # over from one plan to the next never looks uncovered in between.
+            keys = np.concatenate((groups * buckets + self._start[plan_ids], groups * buckets + self._end[plan_ids]))
+            deltas = np.concatenate((np.ones(len(groups), dtype=np.int64), -np.ones(len(groups), dtype=np.int64)))
+            order = np.argsort(keys, kind='stable')
+            keys, deltas = keys[order], deltas[order]
+            # Every group sums to zero, so the global running sum is the per-group coverage.
+            active = np.cumsum(deltas) > 0
+            changes = active.astype(np.int64) - np.concatenate(([False], active[:-1])).astype(np.int64)
+            moved = changes != 0
+            keys = keys[moved]
+            counts[member, :buckets] = self._sweep(keys % buckets, keys // buckets // providers, changes[moved])
+        return counts
+
+    def _cell(self, member: str, age: Optional[int], city: Optional[str]) -> Optional[tuple]:
+        if city:
+            code = self.city_codes.get(city)
+            if code is None:
+                return None
+        else:
+            code = len(self.cities)
+        return self.member_codes.get(member, 0), self.age_bucket(age), code
+
+    def count(self, member: str, age: Optional[int], city: Optional[str]) -> int:
+        cell = self._cell(member, age, city)
+        return int(self.plan_counts[cell]) if cell else 0
+
+    def summary(self, member: str, age: Optional[int], city: Optional[str]) -> dict:
+        """``summarize_plans`` output for the plans matching the filters, without cost limits."""
+        cell = self._cell(member, age, city)
+        if cell is None or not self.plan_counts[cell]:
+            return dict(EMPTY_SUMMARY)
+        return {
+            'plan_count': int(self.plan_counts[cell]),
+            'provider_count': int(self.provider_counts[cell]),
+            # A city filter scopes the summary to that one city.
+            'city_count': 1 if city else int(self.city_counts[cell[:2]]) or 1,
+            'child_ready': int(self.child_ready[cell]),
+            'adult_ready': int(self.adult_ready[cell]),
+        }
+
+    def member_counts(self, age: Optional[int], city: Optional[str]) -> dict:
+        return {member: self.count(member, age, city) for member in FACET_MEMBERS if member}
+
+    def top_cities(self, member: str, age: Optional[int], limit: int) -> list:
+        """``(city, plan_count)`` for the ``limit`` cities with the most matching plans."""
+        member_code, bucket, _ = self._cell(member, age, None)
+        counts = self.plan_counts[member_code, bucket, :len(self.cities)]
+        candidates = np.arange(len(counts))
+        if 0 < limit < len(counts):
+            # Everything above the limit-th largest count, then ties by name.
+            threshold = np.partition(counts, len(counts) - limit)[len(counts) - limit]
+            above = np.flatnonzero(counts > threshold)
+            tied = np.flatnonzero(counts == threshold)[:limit - len(above)]
+            candidates = np.concatenate((above, tied))
+        ranked = sorted(candidates.tolist(), key=lambda code: (-counts[code], code))[:limit]
+        return [(self.cities[code], int(counts[code])) for code in ranked if counts[code]]
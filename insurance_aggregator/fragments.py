@@ -0,0 +1,101 @@
+"""
+Pre-rendered plan fragments for the product and compare pages.
+
+A plan's card and its comparison column depend only on the plan, so each is
+rendered once per catalog version and reused by every request that shows the
+plan. The product page then joins finished HTML instead of running the card
+template's tags, filters and fallbacks per plan, and its render time no
+longer grows with the number of cards shown.
+
+Fragments are keyed on the plan's slug. A store belongs to one catalog
+version, so within it a slug always names the same plan, whether the record
+came from the snapshot or from the Plan table. Each store keeps the
+``PLAN_FRAGMENT_CACHE_SIZE`` most recently added cards and comparison
+columns. When the whole catalog fits, every comparison column is formatted
+as the version is published, and any comparison table, including one of
+plans picked on ``/compare/``, is gathered from finished cells.
+"""
+
+import threading
+from typing import Optional
+
+from django.conf import settings
+from django.template.loader import get_template
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+from .data_loader import comparison_fields
+from .timing import timed
+
+CARD_TEMPLATE = 'fragments/plan_card.html'
+
+
+def comparison_value(plan, spec: dict) -> str:
+    raw_value = plan.get(spec['key'])
+    if spec.get('type') == 'bool':
+        return 'Yes' if raw_value else 'No'
+    return raw_value or '—'
+
+
+class PlanFragments:
+    def __init__(self, size: Optional[int] = None):
+        self.size = settings.PLAN_FRAGMENT_CACHE_SIZE if size is None else size
+        self.specs = comparison_fields()
+        self._cards = {}
+        self._columns = {}
+        self._lock = threading.Lock()
+
+    def _remember(self, store: dict, slug: str, fragment):
+        if self.size:
+            with self._lock:
+                store[slug] = fragment
+                while len(store) > self.size:
+                    # Dicts keep insertion order, so this drops the oldest plan.
+                    del store[next(iter(store))]
+        return fragment
+
+    def _render_column(self, plan) -> tuple:
+        header = format_html('<th class="px-6 py-4">{}</th>', plan.plan_name)
+        cells = tuple(
+            format_html('<td class="px-6 py-4 text-brand/70">{}</td>', comparison_value(plan, spec))
+            for spec in self.specs
+        )
+        return header, cells
+
+    def card(self, plan) -> str:
+        card = self._cards.get(plan.slug)
+        if card is None:
+            card = mark_safe(get_template(CARD_TEMPLATE).render({'plan': plan}))
+            self._remember(self._cards, plan.slug, card)
+        return card
+
+    def column(self, plan) -> tuple:
+        """``(header cell, comparison cells)`` for ``plan``."""
+        column = self._columns.get(plan.slug)
+        if column is None:
+            column = self._remember(self._columns, plan.slug, self._render_column(plan))
+        return column
+
+    def precompute(self, plans) -> None:
+        """Format every plan's comparison column now, if the catalog fits in the store."""
+        if not self.size or len(plans) > self.size:
+            return
+        columns = {plan.slug: self._render_column(plan) for plan in plans}
+        with self._lock:
+            self._columns.update(columns)
+
+    @timed('fragments')
+    def cards(self, plans) -> list:
+        return [self.card(plan) for plan in plans]
+
+    @timed('fragments')
+    def comparison(self, plans) -> dict:
+        """Table header cells and one row of cells per comparison field."""
+        columns = [self.column(plan) for plan in plans]
+        return {
+            'comparison_headers': mark_safe(''.join(header for header, _ in columns)),
+            'comparison_rows': [
+                {'label': spec['label'], 'cells': mark_safe(''.join(cells[position] for _, cells in columns))}
+                for position, spec in enumerate(self.specs)
+            ],
+        }
@@ -0,0 +1,270 @@
+"""
+Micro-benchmarks for the plan catalog hot paths.
+
+Each size gets a synthetic feed written to a temporary NDJSON file. The
+command then times the following, with the median and best run recorded in
+milliseconds:
+
+- loading the catalog cold from the feed and from a precompiled snapshot,
+  warm from an already loaded holder, and reloading it after one entry was
+  appended to the feed;
+- ``filter_plans`` and ``summarize_plans`` across member/age/city
+  combinations, and the precomputed facets that replace the summaries;
+- ``get_unique_cities``, the city prefix index and typo-tolerant city
+  resolution;
+- rendering plan cards and comparison columns, and reading them back from the
+  fragment store;
+- a full render of ``product.html``.
+
+Results are written as JSON. When a baseline file exists, any benchmark
+slower than it by more than ``--tolerance`` is reported and the command
+exits non-zero.
+"""
+
+import json
+import platform
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.template.loader import render_to_string
+from django.test import override_settings
+
+from insurance_aggregator.catalog import CatalogHolder
+from insurance_aggregator.catalog_snapshot import write_snapshot
+from insurance_aggregator.city_index import CityIndex
+from insurance_aggregator.data_loader import (
+    file_digest,
+    filter_plans,
+    get_unique_cities,
+    summarize_plans,
+    top_plans,
+)
+from insurance_aggregator.facets import PlanFacets
+from insurance_aggregator.fragments import PlanFragments
+from insurance_aggregator.synthetic import iter_synthetic_entries
+from insurance_aggregator.views import (
+    DEDUCTIBLE_LIMITS,
+    MEMBER_OPTIONS,
+    OOP_LIMITS,
+    SORT_OPTIONS,
+    _product_results,
+)
+
+BENCHMARK_DIR = Path(settings.BASE_DIR) / 'build' / 'benchmarks'
+
+MEMBERS = ('adult', 'child', 'family', 'government', '')
+AGES = (10, 24, 45)
+
+# Slowdowns below this many milliseconds are treated as timer noise.
+NOISE_FLOOR_MS = 0.05
+
+
+def _measure(func, repeat: int, calls: int = 1) -> dict:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000 / calls)
+    return {'median_ms': statistics.median(timings), 'min_ms': min(timings), 'runs': repeat}
+
+
+def _write_feed(path: Path, size: int, seed: int) -> None:
+    with path.open('w', encoding='utf-8') as feed:
+        for entry in iter_synthetic_entries(size, seed=seed):
+            feed.write(json.dumps(entry, ensure_ascii=False))
+            feed.write('\n')
+
+
+class Command(BaseCommand):
+    help = 'Benchmark catalog loading, filtering, summaries and the product page render over synthetic catalogs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[50, 10_000, 1_000_000])
+        parser.add_argument('--repeat', type=int, default=7, help='Runs per benchmark.')
+        parser.add_argument('--cold-repeat', type=int, default=3, help='Runs per cold catalog load.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--mode', choices=['bitmap', 'columnar'], default=settings.PLAN_CATALOG_MODE)
+        parser.add_argument('--output', default=str(BENCHMARK_DIR / 'latest.json'))
+        parser.add_argument('--baseline', default=str(BENCHMARK_DIR / 'baseline.json'))
+        parser.add_argument('--save-baseline', action='store_true', help='Also store these results as the baseline.')
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.25,
+            help='Allowed slowdown against the baseline before flagging (0.25 = 25%%).',
+        )
+
+    def handle(self, *args, **options):
+        results = {
+            'meta': {
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'mode': options['mode'],
+                'seed': options['seed'],
+                'repeat': options['repeat'],
+                'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            },
+            'results': {},
+        }
+        with override_settings(PLAN_CATALOG_MODE=options['mode']):
+            for size in options['sizes']:
+                self.stdout.write(f'Benchmarking {size} plans...')
+                results['results'][str(size)] = self._run_size(size, options)
+
+        output = Path(options['output'])
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(results, indent=2) + '\n', encoding='utf-8')
+        self.stdout.write(f'Wrote {output}')
+
+        baseline_path = Path(options['baseline'])
+        regressions = []
+        if baseline_path.exists() and not options['save_baseline']:
+            baseline = json.loads(baseline_path.read_text(encoding='utf-8'))
+            regressions = self._compare(baseline, results, options['tolerance'])
+        if options['save_baseline']:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(results, indent=2) + '\n', encoding='utf-8')
+            self.stdout.write(f'Saved baseline to {baseline_path}')
+        if regressions:
+            raise CommandError('Benchmark regressions against the baseline:\n' + '\n'.join(regressions))
+
+    def _run_size(self, size: int, options: dict) -> dict:
+        repeat = options['repeat']
+        timings = {}
+        with tempfile.TemporaryDirectory(prefix='plan-benchmark-') as workdir:
+            feed = Path(workdir) / 'plans.ndjson'
+            snapshot_path = Path(workdir) / 'plans.snapshot'
+            _write_feed(feed, size, options['seed'])
+
+            timings['load_catalog_cold'] = _measure(
+                lambda: CatalogHolder(feed, check_interval=0).snapshot(), options['cold_repeat'],
+            )
+            holder = CatalogHolder(feed, check_interval=0)
+            snapshot = holder.snapshot()
+            stat = feed.stat()
+            write_snapshot(
+                snapshot_path,
+                snapshot.plans,
+                snapshot.index,
+                options['mode'],
+                file_digest(feed),
+                (stat.st_mtime_ns, stat.st_size),
+                snapshot.entry_hashes,
+            )
+            timings['load_catalog_snapshot'] = _measure(
+                lambda: CatalogHolder(feed, check_interval=0, snapshot_path=snapshot_path).snapshot(),
+                options['cold_repeat'],
+            )
+            timings['load_catalog_warm'] = _measure(holder.snapshot, repeat)
+            appended = iter_synthetic_entries(options['cold_repeat'], seed=options['seed'] + 1)
+
+            def append_and_reload():
+                with feed.open('a', encoding='utf-8') as stream:
+                    stream.write(json.dumps(next(appended), ensure_ascii=False) + '\n')
+                holder.check_for_update()
+
+            timings['load_catalog_incremental'] = _measure(append_and_reload, options['cold_repeat'])
+
+        plans, index = snapshot.plans, snapshot.index
+        cities = get_unique_cities(plans)
+        combinations = [
+            (member, age, city)
+            for member in MEMBERS
+            for age in AGES
+            for city in (cities[0], cities[-1], None)
+        ]
+        selections = [
+            filter_plans(plans, member, age, city, index=index) for member, age, city in combinations
+        ]
+
+        def run_filters():
+            for member, age, city in combinations:
+                filter_plans(plans, member, age, city, index=index)
+
+        def run_summaries():
+            for selection in selections:
+                summarize_plans(selection)
+
+        timings['filter_plans'] = _measure(run_filters, repeat, len(combinations))
+        timings['summarize_plans'] = _measure(run_summaries, repeat, len(selections))
+        timings['facets_build'] = _measure(lambda: PlanFacets(plans), options['cold_repeat'])
+        facets = snapshot.facets
+
+        def run_facet_summaries():
+            for member, age, city in combinations:
+                facets.summary(member, age, city)
+                facets.member_counts(age, city)
+
+        timings['facet_summary'] = _measure(run_facet_summaries, repeat, len(combinations))
+        timings['get_unique_cities'] = _measure(lambda: get_unique_cities(plans), repeat)
+        timings['city_index_build'] = _measure(lambda: CityIndex.from_plans(plans), repeat)
+        city_index = snapshot.city_index
+        prefixes = ('n', 'new', 'san d', 'town 1', 'ct', 'zz')
+
+        def run_city_search():
+            for prefix in prefixes:
+                # _search bypasses the per-index LRU so every run does the lookup.
+                city_index._search(prefix, 8)
+
+        timings['city_search'] = _measure(run_city_search, repeat, len(prefixes))
+        misspelled = ('new havn', 'bostn, ma', 'los angelos california', 'twn 12', 'xyzzy')
+
+        def run_city_resolve():
+            for query in misspelled:
+                city_index._resolve(query)
+
+        timings['city_resolve'] = _measure(run_city_resolve, repeat, len(misspelled))
+
+        shown = top_plans(selections[0] or plans, '', 4)
+        fresh = PlanFragments(size=0)
+        stored = PlanFragments(size=len(shown))
+
+        def build_fragments(fragments):
+            fragments.cards(shown)
+            fragments.comparison(shown[:3])
+
+        timings['plan_fragments_render'] = _measure(lambda: build_fragments(fresh), repeat)
+        build_fragments(stored)
+        timings['plan_fragments_stored'] = _measure(lambda: build_fragments(stored), repeat)
+
+        def render_product():
+            context = {
+                'member_options': MEMBER_OPTIONS,
+                'selected_member': 'adult',
+                'selected_age': 24,
+                'selected_city': cities[0],
+                'sort_options': SORT_OPTIONS,
+                'selected_sort': '',
+                'max_deductible': None,
+                'max_oop': None,
+                'deductible_limits': DEDUCTIBLE_LIMITS,
+                'oop_limits': OOP_LIMITS,
+                'product_content': SimpleNamespace(kicker='', headline='', subheadline=''),
+                **_product_results(snapshot, 'adult', 24, cities[0], '', None, None),
+            }
+            render_to_string('product.html', context)
+
+        timings['render_product'] = _measure(render_product, repeat)
+        for name, timing in timings.items():
+            self.stdout.write(f"  {name:<24} median {timing['median_ms']:10.3f} ms  min {timing['min_ms']:10.3f} ms")
+        return timings
+
+    def _compare(self, baseline: dict, results: dict, tolerance: float) -> list:
+        regressions = []
+        for size, timings in results['results'].items():
+            for name, timing in timings.items():
+                reference = baseline.get('results', {}).get(size, {}).get(name)
+                if reference is None:
+                    continue
+                slowdown = timing['median_ms'] - reference['median_ms']
+                if slowdown > NOISE_FLOOR_MS and timing['median_ms'] > reference['median_ms'] * (1 + tolerance):
+                    regressions.append(
+                        f"{size} plans {name}: {timing['median_ms']:.3f} ms vs baseline "
+                        f"{reference['median_ms']:.3f} ms (+{slowdown / reference['median_ms']:.0%})"
+                    )
+        return regressions
@@ -0,0 +1,46 @@
+"""
+Precompile the plan catalog into a binary snapshot.
+
+Run next to `collectstatic` in the build step so workers start by
+memory-mapping the normalized catalog and its index instead of parsing
+`plans.json`. Workers rebuild the snapshot themselves if it goes stale.
+"""
+
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from insurance_aggregator.catalog import compile_catalog
+from insurance_aggregator.catalog_snapshot import write_snapshot
+from insurance_aggregator.data_loader import DATA_PATH
+
+
+class Command(BaseCommand):
+    help = 'Write the normalized plan catalog and its index to a binary snapshot.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', default=str(DATA_PATH), help='Path to the plan feed.')
+        parser.add_argument(
+            '--output',
+            default=settings.PLAN_CATALOG_SNAPSHOT_PATH,
+            help='Snapshot path (defaults to PLAN_CATALOG_SNAPSHOT_PATH).',
+        )
+
+    def handle(self, *args, **options):
+        if not options['output']:
+            raise CommandError('No snapshot path configured; set PLAN_CATALOG_SNAPSHOT_PATH or pass --output.')
+        source = Path(options['source'])
+        output = Path(options['output'])
+        stat = source.stat()
+        source_stat = (stat.st_mtime_ns, stat.st_size)
+        started = time.perf_counter()
+        plans, index, digest, entry_hashes = compile_catalog(source, source_stat)
+        write_snapshot(output, plans, index, settings.PLAN_CATALOG_MODE, digest, source_stat, entry_hashes)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Wrote {len(plans)} plans ({digest[:12]}) to {output} '
+                f'in {(time.perf_counter() - started) * 1000:.0f} ms.'
+            )
+        )
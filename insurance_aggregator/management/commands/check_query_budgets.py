@@ -0,0 +1,29 @@
+"""
+Run the query budget tests: every budgeted view, requested with caches
+disabled, must stay within its ``@query_budget``.
+
+The checks themselves live in ``insurance_aggregator/tests/test_query_budgets.py``
+and also run with ``manage.py test``.
+"""
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+TESTS = 'insurance_aggregator.tests.test_query_budgets.QueryBudgetTests'
+
+
+class Command(BaseCommand):
+    help = 'Check every view with a @query_budget against its declared SQL query budget.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--source',
+            choices=['file', 'database', 'all'],
+            default='all',
+            help='Plan catalog source to check (default: both).',
+        )
+
+    def handle(self, *args, **options):
+        labels = [TESTS] if options['source'] == 'all' else [f"{TESTS}.test_{options['source']}_source"]
+        # The test command exits non-zero on any failure.
+        call_command('test', *labels)
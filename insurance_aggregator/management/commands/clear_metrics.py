@@ -0,0 +1,22 @@
+"""
+Delete the metrics every worker wrote to METRICS_DIR.
+
+Run at startup, before the workers start, so counters from a previous deploy
+do not stay in the totals forever.
+"""
+
+from django.core.management.base import BaseCommand
+
+from insurance_aggregator.metrics import REGISTRY
+
+
+class Command(BaseCommand):
+    help = 'Clear the shared metrics store in METRICS_DIR.'
+
+    def handle(self, *args, **options):
+        directory = REGISTRY.directory()
+        if directory is None:
+            self.stdout.write('METRICS_DIR is empty; every worker keeps its own metrics.')
+            return
+        removed = REGISTRY.clear_store()
+        self.stdout.write(self.style.SUCCESS(f'Removed {removed} metrics file(s) from {directory}.'))
@@ -0,0 +1,94 @@
+"""
+Write a synthetic plan feed for load and scale testing.
+
+Entries are generated and written one at a time, so feeds of millions of
+plans never have to fit in memory. The output uses the raw ``plans.json``
+schema and can be fed to ``import_plans``, ``build_catalog_snapshot`` or
+the catalog loader directly.
+"""
+
+import json
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from insurance_aggregator.synthetic import iter_synthetic_entries
+
+
+@contextmanager
+def _open_output(path: str):
+    if path == '-':
+        yield sys.stdout
+        return
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with target.open('w', encoding='utf-8') as stream:
+        yield stream
+
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic plan feed in the raw plans.json schema (JSON array or NDJSON).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="Destination file, or '-' for stdout.")
+        parser.add_argument('--count', type=int, default=10_000, help='Number of plans (default 10000).')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed gives the same feed.')
+        parser.add_argument(
+            '--format',
+            choices=['json', 'ndjson'],
+            default=None,
+            help='Output format (default: from the file extension, JSON otherwise).',
+        )
+        parser.add_argument('--cities', type=int, default=500, help='Number of distinct cities (default 500).')
+        parser.add_argument(
+            '--noise',
+            type=float,
+            default=0.2,
+            help='Chance that a text field carries a :contentReference citation marker (default 0.2).',
+        )
+        parser.add_argument(
+            '--carrier-share',
+            type=float,
+            default=0.3,
+            help='Fraction of plans renamed to a synthetic carrier (default 0.3).',
+        )
+        parser.add_argument(
+            '--skew',
+            type=float,
+            default=1.1,
+            help='Zipf exponent for provider and city popularity; 0 is uniform (default 1.1).',
+        )
+
+    def handle(self, *args, **options):
+        if options['count'] < 0:
+            raise CommandError('--count must not be negative.')
+        if options['cities'] < 1:
+            raise CommandError('--cities must be at least 1.')
+        output_format = options['format']
+        if output_format is None:
+            output_format = 'ndjson' if options['output'].endswith(('.ndjson', '.jsonl')) else 'json'
+
+        entries = iter_synthetic_entries(
+            options['count'],
+            seed=options['seed'],
+            city_count=options['cities'],
+            noise=options['noise'],
+            carrier_share=options['carrier_share'],
+            skew=options['skew'],
+        )
+        with _open_output(options['output']) as stream:
+            if output_format == 'ndjson':
+                for entry in entries:
+                    stream.write(json.dumps(entry, ensure_ascii=False))
+                    stream.write('\n')
+            else:
+                stream.write('[')
+                for position, entry in enumerate(entries):
+                    stream.write(',\n' if position else '\n')
+                    stream.write(json.dumps(entry, ensure_ascii=False))
+                stream.write('\n]\n')
+
+        if options['output'] != '-':
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['count']} plans to {options['output']} ({output_format})."))
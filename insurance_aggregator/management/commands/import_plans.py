@@ -0,0 +1,155 @@
+"""
+Stream the plan feed into the ``Plan`` table.
+
+Entries are streamed one at a time, normalized with the same helpers as the
+in-memory catalog and upserted in batches. A content hash of the normalized
+plan lets unchanged rows skip the write entirely, so re-importing a feed
+where a handful of plans changed only touches those rows, and only those
+rows get a new ``updated_at``. Rows are matched on the plan slug, which is
+unique within a feed even when two plans share a name, so the table holds the
+same plans as the in-memory catalog.
+"""
+
+import hashlib
+import json
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from insurance_aggregator.data_loader import DATA_PATH, iter_normalized_plans
+from insurance_aggregator.models import City, Plan, PlanCity, PlanTag, PlanTagging
+from insurance_aggregator.plan_index import plan_age_bounds
+
+
+def content_hash(normalized: dict) -> str:
+    encoded = json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=list)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def _batched(iterable, size: int):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _plan_fields(normalized: dict, position: int, digest: str) -> dict:
+    fields = {
+        name: normalized.get(name) or ''
+        for name in Plan.TEXT_FIELDS
+    }
+    fields.update((name, bool(normalized.get(name))) for name in Plan.FLAG_FIELDS)
+    fields['age_min'], fields['age_max'] = plan_age_bounds(normalized)
+    fields['deductible_amount'] = normalized.get('deductible_amount')
+    fields['oop_amount'] = normalized.get('oop_amount')
+    fields['plan_name'] = normalized['plan_name']
+    fields['slug'] = normalized['slug']
+    fields['position'] = position
+    fields['content_hash'] = digest
+    return fields
+
+
+def _lookup_ids(model, field: str, values: set) -> dict:
+    model.objects.bulk_create(
+        [model(**{field: value}) for value in values],
+        ignore_conflicts=True,
+    )
+    return dict(model.objects.filter(**{f'{field}__in': values}).values_list(field, 'id'))
+
+
+class Command(BaseCommand):
+    help = 'Stream plans.json into the Plan table, upserting changed plans in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', default=str(DATA_PATH), help='Path to the plan feed (JSON array or NDJSON).')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--keep-missing',
+            action='store_true',
+            help='Keep plans that are no longer present in the feed instead of deleting them.',
+        )
+
+    def handle(self, *args, **options):
+        counts = {'created': 0, 'updated': 0, 'unchanged': 0, 'deleted': 0}
+        seen_ids = set()
+        entries = enumerate(iter_normalized_plans(options['source']))
+        for batch in _batched(entries, options['batch_size']):
+            with transaction.atomic():
+                self._upsert(batch, counts, seen_ids)
+
+        if not options['keep_missing']:
+            stale = [pk for pk in Plan.objects.values_list('id', flat=True).iterator() if pk not in seen_ids]
+            for chunk in _batched(stale, options['batch_size']):
+                counts['deleted'] += Plan.objects.filter(id__in=chunk).delete()[1].get(Plan._meta.label, 0)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                'Imported plans: {created} created, {updated} updated, '
+                '{unchanged} unchanged, {deleted} deleted.'.format(**counts)
+            )
+        )
+
+    def _upsert(self, batch: list, counts: dict, seen_ids: set) -> None:
+        incoming = {}
+        for position, normalized in batch:
+            incoming[normalized['slug']] = (position, normalized, content_hash(normalized))
+
+        existing = {
+            plan.slug: plan
+            for plan in Plan.objects.filter(slug__in=list(incoming)).only('id', 'slug', 'position', 'content_hash')
+        }
+        to_create, to_update = [], []
+        # bulk_update() skips auto_now, so changed rows are stamped here.
+        now = timezone.now()
+        for slug, (position, normalized, digest) in incoming.items():
+            plan = existing.get(slug)
+            if plan is None:
+                to_create.append(Plan(**_plan_fields(normalized, position, digest)))
+            elif plan.content_hash != digest or plan.position != position:
+                for field, value in _plan_fields(normalized, position, digest).items():
+                    setattr(plan, field, value)
+                plan.updated_at = now
+                to_update.append(plan)
+            else:
+                counts['unchanged'] += 1
+                seen_ids.add(plan.id)
+
+        Plan.objects.bulk_create(to_create)
+        if to_update:
+            update_fields = list(Plan.TEXT_FIELDS + Plan.FLAG_FIELDS) + [
+                'plan_name', 'age_min', 'age_max', 'deductible_amount', 'oop_amount', 'position', 'content_hash',
+                'updated_at',
+            ]
+            Plan.objects.bulk_update(to_update, update_fields)
+        counts['created'] += len(to_create)
+        counts['updated'] += len(to_update)
+
+        written_slugs = [plan.slug for plan in to_create + to_update]
+        if not written_slugs:
+            return
+        written = dict(Plan.objects.filter(slug__in=written_slugs).values_list('slug', 'id'))
+        seen_ids.update(written.values())
+        self._replace_relations(written, incoming)
+
+    def _replace_relations(self, written: dict, incoming: dict) -> None:
+        PlanCity.objects.filter(plan_id__in=written.values()).delete()
+        PlanTagging.objects.filter(plan_id__in=written.values()).delete()
+
+        city_names = {city for slug in written for city in incoming[slug][1]['cities']}
+        tag_labels = {tag for slug in written for tag in incoming[slug][1]['tags']}
+        city_ids = _lookup_ids(City, 'name', city_names)
+        tag_ids = _lookup_ids(PlanTag, 'label', tag_labels)
+
+        city_links, tag_links = [], []
+        for slug, plan_id in written.items():
+            normalized = incoming[slug][1]
+            for order, city in enumerate(dict.fromkeys(normalized['cities'])):
+                city_links.append(PlanCity(plan_id=plan_id, city_id=city_ids[city], order=order))
+            for order, tag in enumerate(dict.fromkeys(normalized['tags'])):
+                tag_links.append(PlanTagging(plan_id=plan_id, tag_id=tag_ids[tag], order=order))
+        PlanCity.objects.bulk_create(city_links)
+        PlanTagging.objects.bulk_create(tag_links)
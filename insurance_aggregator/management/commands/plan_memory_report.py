@@ -0,0 +1,97 @@
+"""
+Report the per-worker resident memory of the normalized plan catalog.
+
+Each measurement runs in a forked child so the numbers reflect what a fresh
+gunicorn worker holds: the legacy dict layout (every plan a dict with its own
+display strings) versus the slotted ``PlanRecord`` layout with shared strings.
+"""
+
+import json
+import multiprocessing
+import os
+import resource
+
+from django.core.management.base import BaseCommand
+
+from insurance_aggregator.data_loader import (
+    DATA_PATH,
+    _build_audience_label,
+    build_plan_records,
+    normalize_entry,
+)
+
+
+def _current_rss_kib() -> int:
+    try:
+        with open('/proc/self/statm') as statm:
+            resident_pages = int(statm.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _synthetic_entries(seed_entries: list, size: int):
+    for position in range(size):
+        entry = dict(seed_entries[position % len(seed_entries)])
+        entry['plan_name'] = f"{entry.get('plan_name', 'Plan')} #{position}"
+        yield entry
+
+
+def _build_dict_catalog(entries) -> list:
+    catalog = []
+    for entry in entries:
+        normalized = normalize_entry(entry)
+        normalized['audience_label'] = _build_audience_label(normalized)
+        normalized['cities_display'] = ', '.join(normalized['cities'])
+        catalog.append(normalized)
+    return catalog
+
+
+LAYOUTS = {
+    'dict': _build_dict_catalog,
+    'record': build_plan_records,
+}
+
+
+def _measure(layout: str, seed_entries: list, size: int, results) -> list:
+    before = _current_rss_kib()
+    catalog = LAYOUTS[layout](_synthetic_entries(seed_entries, size))
+    after = _current_rss_kib()
+    results.put(after - before)
+    return catalog
+
+
+class Command(BaseCommand):
+    help = 'Measure per-worker RSS of the plan catalog for the dict and PlanRecord layouts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            nargs='+',
+            type=int,
+            default=[1000, 100000],
+            help='Catalog sizes to measure (plans are cycled from plans.json).',
+        )
+
+    def handle(self, *args, **options):
+        with DATA_PATH.open() as source:
+            seed_entries = json.load(source)
+
+        context = multiprocessing.get_context('fork')
+        rows = []
+        for size in options['sizes']:
+            measured = {}
+            for layout in LAYOUTS:
+                results = context.Queue()
+                worker = context.Process(target=_measure, args=(layout, seed_entries, size, results))
+                worker.start()
+                measured[layout] = results.get()
+                worker.join()
+            rows.append((size, measured['dict'], measured['record']))
+
+        self.stdout.write(f"{'plans':>10}  {'dict (MiB)':>12}  {'record (MiB)':>12}  {'saved':>7}")
+        for size, dict_kib, record_kib in rows:
+            saved = 1 - record_kib / dict_kib if dict_kib else 0
+            self.stdout.write(
+                f'{size:>10}  {dict_kib / 1024:>12.1f}  {record_kib / 1024:>12.1f}  {saved:>6.0%}'
+            )
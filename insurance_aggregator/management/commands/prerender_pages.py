@@ -0,0 +1,38 @@
+"""
+Render the home and about pages to static HTML.
+
+Run at startup, after `migrate`, so WhiteNoise serves the marketing pages
+from the first request on. Admin edits to their content rebuild them
+automatically afterwards.
+"""
+
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from insurance_aggregator.prerender import build_pages
+
+
+class Command(BaseCommand):
+    help = 'Pre-render the marketing pages into static HTML with compressed variants.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            default=settings.PRERENDERED_PAGES_DIR,
+            help='Pages directory (defaults to PRERENDERED_PAGES_DIR).',
+        )
+
+    def handle(self, *args, **options):
+        if not options['output']:
+            raise CommandError('No pages directory configured; set PRERENDERED_PAGES_DIR or pass --output.')
+        started = time.perf_counter()
+        build = build_pages(Path(options['output']))
+        for path in sorted(build.rglob('*')):
+            if path.is_file():
+                self.stdout.write(f'  {path.relative_to(build)} ({path.stat().st_size} bytes)')
+        self.stdout.write(
+            self.style.SUCCESS(f'Published {build} in {(time.perf_counter() - started) * 1000:.0f} ms.')
+        )
@@ -0,0 +1,428 @@
+"""
+In-process metrics with a Prometheus text endpoint.
+
+Counters, gauges and histograms live in one registry per process and are
+updated under a single lock, so recording a value is a dict update. Serving
+processes write their values to ``METRICS_DIR`` as ``<pid>.json``, at most
+every ``METRICS_FLUSH_SECONDS`` after a response and once more at exit, with
+an atomic rename. ``/metrics`` merges every file in the directory, so a
+scrape sees the whole host no matter which gunicorn worker answers it:
+
+- counters and histograms are summed over all files. Files left by workers
+  that exited stay in the sum, so totals do not drop when gunicorn recycles a
+  worker;
+- gauges are combined over live workers only, by their ``aggregate`` mode
+  (``max`` or ``sum``).
+
+Values are up to one flush interval old for other workers; the answering
+worker flushes before it reads. With ``METRICS_DIR`` empty each process
+reports only its own values. ``python manage.py clear_metrics`` empties the
+directory; the start command runs it before the workers start, so totals
+begin at zero with every deploy.
+
+Outside DEBUG, ``/metrics`` is only served with ``METRICS_TOKEN`` set and
+answers 404 otherwise.
+"""
+
+import atexit
+import hmac
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from pathlib import Path
+from typing import Optional
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.views.decorators.http import require_GET
+
+from .query_budget import query_budget
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds; request latency and catalog loads.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Seconds; in-memory catalog queries, which mostly finish well under a millisecond.
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class Metric:
+    kind = ''
+    # Events reset in a forked child, whose parent reports its own; state carries over.
+    reset_on_fork = True
+
+    def __init__(self, name: str, documentation: str, labelnames=(), registry: Optional['MetricsRegistry'] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.registry = registry or REGISTRY
+        self._values = {}
+        self.registry.register(self)
+
+    def _key(self, labels: dict) -> tuple:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f'{self.name} takes labels {self.labelnames}, got {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> list:
+        """``[label values, value]`` pairs, as written to the shared store."""
+        return [[list(key), value] for key, value in self._values.items()]
+
+    def merge(self, per_process: list) -> dict:
+        """Combine ``(pid, samples)`` pairs from every process into ``{label values: value}``."""
+        merged = {}
+        for _, samples in per_process:
+            for key, value in samples:
+                key = tuple(key)
+                merged[key] = merged.get(key, 0) + value
+        return merged
+
+    def expose(self, merged: dict) -> list:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for key in sorted(merged):
+            lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(merged[key])}')
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self.registry.lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+    reset_on_fork = False
+
+    def __init__(self, name: str, documentation: str, labelnames=(), aggregate: str = 'max', **kwargs):
+        if aggregate not in ('max', 'sum'):
+            raise ValueError(f'Unknown gauge aggregate {aggregate!r}')
+        self.aggregate = aggregate
+        super().__init__(name, documentation, labelnames, **kwargs)
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self.registry.lock:
+            self._values[key] = value
+
+    def merge(self, per_process: list) -> dict:
+        merged = {}
+        for pid, samples in per_process:
+            # A gauge describes a running worker; one that exited has nothing to report.
+            if pid != os.getpid() and not _pid_alive(pid):
+                continue
+            for key, value in samples:
+                key = tuple(key)
+                if key not in merged:
+                    merged[key] = value
+                elif self.aggregate == 'sum':
+                    merged[key] += value
+                else:
+                    merged[key] = max(merged[key], value)
+        return merged
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS, **kwargs):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, **kwargs)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        # Observations at a bound count in that bucket ("le"); the last slot is +Inf.
+        slot = bisect_left(self.buckets, value)
+        with self.registry.lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][slot] += 1
+            entry[1] += value
+
+    def time(self, **labels) -> '_HistogramTimer':
+        """Observe the duration of a ``with`` block or of every call to a decorated function."""
+        return _HistogramTimer(self, labels)
+
+    def samples(self) -> list:
+        return [[list(key), [list(counts), total]] for key, (counts, total) in self._values.items()]
+
+    def merge(self, per_process: list) -> dict:
+        merged = {}
+        for _, samples in per_process:
+            for key, (counts, total) in samples:
+                key = tuple(key)
+                if len(counts) != len(self.buckets) + 1:
+                    # Written with other bucket bounds, by an older deploy.
+                    continue
+                entry = merged.get(key)
+                if entry is None:
+                    merged[key] = [list(counts), total]
+                else:
+                    entry[0] = [left + right for left, right in zip(entry[0], counts)]
+                    entry[1] += total
+        return merged
+
+    def expose(self, merged: dict) -> list:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        bounds = self.buckets + (float('inf'),)
+        for key in sorted(merged):
+            counts, total = merged[key]
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                bucket = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f'{self.name}_bucket{bucket} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class _HistogramTimer:
+    __slots__ = ('histogram', 'labels', 'started')
+
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+
+    def __call__(self, func):
+        histogram, labels = self.histogram, self.labels
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started, **labels)
+
+        return wrapper
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self._flushed_at = 0.0
+        self._flush_at_exit = False
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self) -> None:
+        self.lock = threading.Lock()
+        self._flushed_at = 0.0
+        for metric in self.metrics.values():
+            if metric.reset_on_fork:
+                metric._values = {}
+
+    def register(self, metric: Metric) -> None:
+        if metric.name in self.metrics:
+            raise ValueError(f'Metric {metric.name} is already registered')
+        self.metrics[metric.name] = metric
+
+    def samples(self) -> dict:
+        with self.lock:
+            return {name: metric.samples() for name, metric in self.metrics.items()}
+
+    @staticmethod
+    def directory() -> Optional[Path]:
+        return Path(settings.METRICS_DIR) if settings.METRICS_DIR else None
+
+    def enable_flush(self) -> None:
+        """Write this process's values to the shared store from now on; called by serving processes."""
+        if self.directory() is not None and not self._flush_at_exit:
+            self._flush_at_exit = True
+            atexit.register(self.flush)
+
+    def clear_store(self) -> int:
+        """Delete every process's values from the shared store; returns how many files went."""
+        directory = self.directory()
+        if directory is None or not directory.is_dir():
+            return 0
+        removed = 0
+        for path in directory.glob('*.json'):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                continue
+            removed += 1
+        return removed
+
+    def flush(self) -> None:
+        directory = self.directory()
+        if directory is None:
+            return
+        self._flushed_at = time.monotonic()
+        payload = json.dumps({'pid': os.getpid(), 'metrics': self.samples()}, separators=(',', ':'))
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            handle, temporary = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix='.json')
+            with os.fdopen(handle, 'w', encoding='utf-8') as output:
+                output.write(payload)
+            os.replace(temporary, directory / f'{os.getpid()}.json')
+        except OSError:
+            logger.warning('Could not write metrics to %s', directory, exc_info=True)
+
+    def maybe_flush(self) -> None:
+        if time.monotonic() - self._flushed_at >= settings.METRICS_FLUSH_SECONDS:
+            self.flush()
+
+    def _per_process(self) -> list:
+        """``(pid, samples by metric name)`` for every process in the shared store, this one included."""
+        directory = self.directory()
+        if directory is None:
+            return [(os.getpid(), self.samples())]
+        self.flush()
+        processes = []
+        for path in directory.glob('*.json'):
+            if path.name.startswith('.'):
+                continue
+            try:
+                data = json.loads(path.read_text(encoding='utf-8'))
+                processes.append((int(data['pid']), data['metrics']))
+            except (OSError, ValueError, KeyError, TypeError):
+                logger.warning('Skipping unreadable metrics file %s', path)
+        return processes
+
+    def exposition(self) -> str:
+        processes = self._per_process()
+        lines = []
+        for name, metric in self.metrics.items():
+            per_process = [(pid, metrics[name]) for pid, metrics in processes if name in metrics]
+            lines.extend(metric.expose(metric.merge(per_process)))
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+REQUESTS = Counter('http_requests_total', 'Requests served, by route, method and status.', ['route', 'method', 'status'])
+REQUEST_SECONDS = Histogram('http_request_duration_seconds', 'Request latency in seconds, by route.', ['route', 'method'])
+DATA_LOADER_SECONDS = Histogram(
+    'data_loader_duration_seconds',
+    'Time spent in the data_loader query functions, in seconds.',
+    ['function'],
+    buckets=FAST_BUCKETS,
+)
+CACHE_LOOKUPS = Counter(
+    'page_cache_lookups_total',
+    'Cache reads by cache and result; content-memory is the per-process layer in front of content.',
+    ['cache', 'result'],
+)
+CATALOG_LOAD_SECONDS = Histogram(
+    'plan_catalog_load_duration_seconds',
+    'Time to publish a catalog version, by where it was loaded from.',
+    ['source'],
+)
+CATALOG_RELOADS = Counter(
+    'plan_catalog_reloads_total', 'Catalog reloads that swapped in a new version, or failed.', ['result'],
+)
+CATALOG_PLAN_CHANGES = Counter(
+    'plan_catalog_plan_changes_total', 'Plans added, updated or removed by catalog reloads.', ['change'],
+)
+CATALOG_PLANS = Gauge('plan_catalog_plans', 'Plans in the catalog version being served.')
+CATALOG_VERSION = Gauge('plan_catalog_version', 'Catalog version being served.')
+
+
+def cache_lookup(cache_name: str, hit: bool) -> None:
+    CACHE_LOOKUPS.inc(cache=cache_name, result='hit' if hit else 'miss')
+
+
+def _route(request) -> str:
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        # Pre-rendered pages are answered before URL resolution.
+        return getattr(request, 'prerendered_page', 'unmatched')
+    return match.view_name or match.route
+
+
+class MetricsMiddleware:
+    """Record every request's route, status and latency, and flush to the shared store."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        REGISTRY.enable_flush()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self._record(request, response, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self._record(request, response, time.perf_counter() - started)
+        return response
+
+    def _record(self, request, response, seconds: float) -> None:
+        route = _route(request)
+        REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+        REQUEST_SECONDS.observe(seconds, route=route, method=request.method)
+        REGISTRY.maybe_flush()
+
+
+@query_budget(0)
+@require_GET
+def metrics(request):
+    token = settings.METRICS_TOKEN
+    if not token:
+        # Without a token the endpoint only exists for local development.
+        if not settings.DEBUG:
+            raise Http404('METRICS_TOKEN is not set.')
+    elif not hmac.compare_digest(request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()):
+        return HttpResponse('Unauthorized\n', status=401, content_type='text/plain')
+    return HttpResponse(REGISTRY.exposition(), content_type=CONTENT_TYPE)
@@ -0,0 +1,123 @@
+# Generated by Django 4.2.26 on 2026-10-18 12:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('insurance_aggregator', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='City',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=150, unique=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Cities',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Plan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('plan_name', models.CharField(max_length=255, unique=True)),
+                ('provider', models.CharField(blank=True, max_length=120)),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('overall_deductible', models.TextField(blank=True)),
+                ('services_before_deductible', models.TextField(blank=True)),
+                ('specific_service_deductible', models.TextField(blank=True)),
+                ('oop_individual', models.TextField(blank=True)),
+                ('oop_family', models.TextField(blank=True)),
+                ('oop_hospital', models.TextField(blank=True)),
+                ('excluded_from_oop', models.TextField(blank=True)),
+                ('network_lower_cost', models.BooleanField(default=False)),
+                ('referral_required', models.BooleanField(default=False)),
+                ('age_min', models.PositiveSmallIntegerField(default=0)),
+                ('age_max', models.PositiveSmallIntegerField(default=120)),
+                ('for_child', models.BooleanField(default=False)),
+                ('for_adult', models.BooleanField(default=False)),
+                ('supports_family', models.BooleanField(default=False)),
+                ('is_government', models.BooleanField(default=False)),
+                ('content_hash', models.CharField(max_length=64)),
+            ],
+            options={
+                'ordering': ['position', 'id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PlanTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('label', models.CharField(max_length=80, unique=True)),
+            ],
+            options={
+                'ordering': ['label'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PlanTagging',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order', models.PositiveIntegerField(default=0)),
+                ('plan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_links', to='insurance_aggregator.plan')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='plan_links', to='insurance_aggregator.plantag')),
+            ],
+            options={
+                'ordering': ['order'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PlanCity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order', models.PositiveIntegerField(default=0)),
+                ('city', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='plan_links', to='insurance_aggregator.city')),
+                ('plan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='city_links', to='insurance_aggregator.plan')),
+            ],
+            options={
+                'ordering': ['order'],
+            },
+        ),
+        migrations.AddField(
+            model_name='plan',
+            name='cities',
+            field=models.ManyToManyField(related_name='plans', through='insurance_aggregator.PlanCity', to='insurance_aggregator.city'),
+        ),
+        migrations.AddField(
+            model_name='plan',
+            name='tags',
+            field=models.ManyToManyField(related_name='plans', through='insurance_aggregator.PlanTagging', to='insurance_aggregator.plantag'),
+        ),
+        migrations.AddConstraint(
+            model_name='plantagging',
+            constraint=models.UniqueConstraint(fields=('plan', 'tag'), name='unique_plan_tag'),
+        ),
+        migrations.AddIndex(
+            model_name='plancity',
+            index=models.Index(fields=['city', 'plan'], name='plan_city_lookup_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='plancity',
+            constraint=models.UniqueConstraint(fields=('plan', 'city'), name='unique_plan_city'),
+        ),
+        migrations.AddIndex(
+            model_name='plan',
+            index=models.Index(fields=['age_min', 'age_max'], name='plan_age_bounds_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plan',
+            index=models.Index(fields=['for_adult', 'for_child', 'is_government'], name='plan_audience_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plan',
+            index=models.Index(fields=['position'], name='plan_position_idx'),
+        ),
+    ]
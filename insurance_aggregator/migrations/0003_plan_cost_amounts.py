@@ -0,0 +1,31 @@
+# Generated by Django 4.2.26 on 2026-10-18 12:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('insurance_aggregator', '0002_plan_catalog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plan',
+            name='deductible_amount',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='plan',
+            name='oop_amount',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='plan',
+            index=models.Index(fields=['deductible_amount', 'position'], name='plan_deductible_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plan',
+            index=models.Index(fields=['oop_amount', 'position'], name='plan_oop_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.26 on 2026-10-18 18:40
+
+from django.db import migrations, models
+
+from insurance_aggregator.data_loader import plan_slug
+
+
+def fill_slugs(apps, schema_editor):
+    Plan = apps.get_model('insurance_aggregator', 'Plan')
+    plans = list(Plan.objects.only('id', 'plan_name'))
+    for plan in plans:
+        plan.slug = plan_slug(plan.plan_name)
+    Plan.objects.bulk_update(plans, ['slug'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('insurance_aggregator', '0003_plan_cost_amounts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plan',
+            name='slug',
+            field=models.SlugField(default='', max_length=80),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_slugs, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='plan',
+            name='slug',
+            field=models.SlugField(max_length=80, unique=True),
+        ),
+    ]
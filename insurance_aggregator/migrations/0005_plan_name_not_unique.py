@@ -0,0 +1,18 @@
+# Generated by Django 4.2.26 on 2026-10-18 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('insurance_aggregator', '0004_plan_slug'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='plan',
+            name='plan_name',
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+    ]
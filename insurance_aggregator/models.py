@@ -1,5 +1,8 @@
 from django.db import models
 
+from .data_loader import PlanRecord, plan_slug
+from .plan_index import SEGMENT_FIELDS
+
 
 class TimeStampedModel(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
@@ -141,3 +144,185 @@ class ContactPageContent(TimeStampedModel):
 
     def __str__(self):
         return 'Contact Page Content'
+
+
+class City(models.Model):
+    name = models.CharField(max_length=150, unique=True)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name_plural = 'Cities'
+
+    def __str__(self):
+        return self.name
+
+
+class PlanTag(models.Model):
+    label = models.CharField(max_length=80, unique=True)
+
+    class Meta:
+        ordering = ['label']
+
+    def __str__(self):
+        return self.label
+
+
+class PlanQuerySet(models.QuerySet):
+    def matching(self, member: str, age=None, city=None, max_deductible=None, max_oop=None):
+        plans = self
+        field = SEGMENT_FIELDS.get(member)
+        if field:
+            plans = plans.filter(**{field: True})
+        if city:
+            plans = plans.filter(city_links__city__name=city)
+        if age is not None:
+            plans = plans.filter(age_min__lte=age, age_max__gte=age)
+        if max_deductible is not None:
+            plans = plans.filter(deductible_amount__lte=max_deductible)
+        if max_oop is not None:
+            plans = plans.filter(oop_amount__lte=max_oop)
+        return plans
+
+    def cheapest(self, field: str):
+        return self.order_by(models.F(field).asc(nulls_last=True), 'position', 'id')
+
+    def with_relations(self):
+        return self.prefetch_related(
+            models.Prefetch('city_links', queryset=PlanCity.objects.select_related('city')),
+            models.Prefetch('tag_links', queryset=PlanTagging.objects.select_related('tag')),
+        )
+
+    def summarize(self) -> dict:
+        totals = self.aggregate(
+            plan_count=models.Count('id'),
+            provider_count=models.Count('provider', distinct=True, filter=~models.Q(provider='')),
+            child_ready=models.Count('id', filter=models.Q(for_child=True)),
+            adult_ready=models.Count('id', filter=models.Q(for_adult=True)),
+        )
+        if not totals['plan_count']:
+            return {'plan_count': 0, 'provider_count': 0, 'city_count': 0, 'child_ready': 0, 'adult_ready': 0}
+        city_count = City.objects.filter(plans__in=self.order_by().values('id')).distinct().count()
+        return {
+            'plan_count': totals['plan_count'],
+            'provider_count': totals['provider_count'],
+            'city_count': city_count or 1,
+            'child_ready': totals['child_ready'],
+            'adult_ready': totals['adult_ready'],
+        }
+
+
+class Plan(TimeStampedModel):
+    # Feeds may list two plans under one name; the slug is the plan's identity.
+    plan_name = models.CharField(max_length=255, db_index=True)
+    slug = models.SlugField(max_length=80, unique=True)
+    provider = models.CharField(max_length=120, blank=True)
+    position = models.PositiveIntegerField(default=0)
+    overall_deductible = models.TextField(blank=True)
+    services_before_deductible = models.TextField(blank=True)
+    specific_service_deductible = models.TextField(blank=True)
+    oop_individual = models.TextField(blank=True)
+    oop_family = models.TextField(blank=True)
+    oop_hospital = models.TextField(blank=True)
+    excluded_from_oop = models.TextField(blank=True)
+    network_lower_cost = models.BooleanField(default=False)
+    referral_required = models.BooleanField(default=False)
+    age_min = models.PositiveSmallIntegerField(default=0)
+    age_max = models.PositiveSmallIntegerField(default=120)
+    for_child = models.BooleanField(default=False)
+    for_adult = models.BooleanField(default=False)
+    supports_family = models.BooleanField(default=False)
+    is_government = models.BooleanField(default=False)
+    # Parsed from the cost text at import; null flags an unparseable value.
+    deductible_amount = models.PositiveIntegerField(null=True, blank=True)
+    oop_amount = models.PositiveIntegerField(null=True, blank=True)
+    content_hash = models.CharField(max_length=64)
+    cities = models.ManyToManyField(City, through='PlanCity', related_name='plans')
+    tags = models.ManyToManyField(PlanTag, through='PlanTagging', related_name='plans')
+
+    objects = PlanQuerySet.as_manager()
+
+    TEXT_FIELDS = (
+        'provider',
+        'overall_deductible',
+        'services_before_deductible',
+        'specific_service_deductible',
+        'oop_individual',
+        'oop_family',
+        'oop_hospital',
+        'excluded_from_oop',
+    )
+    FLAG_FIELDS = (
+        'network_lower_cost',
+        'referral_required',
+        'for_child',
+        'for_adult',
+        'supports_family',
+        'is_government',
+    )
+
+    class Meta:
+        ordering = ['position', 'id']
+        indexes = [
+            models.Index(fields=['age_min', 'age_max'], name='plan_age_bounds_idx'),
+            models.Index(fields=['for_adult', 'for_child', 'is_government'], name='plan_audience_idx'),
+            models.Index(fields=['position'], name='plan_position_idx'),
+            models.Index(fields=['deductible_amount', 'position'], name='plan_deductible_idx'),
+            models.Index(fields=['oop_amount', 'position'], name='plan_oop_idx'),
+        ]
+
+    def __str__(self):
+        return self.plan_name
+
+    def save(self, *args, **kwargs):
+        # Plans added in the admin get the slug the feed import would give them,
+        # numbered the same way when another plan already has the name.
+        if not self.slug:
+            base = plan_slug(self.plan_name)
+            slug, number = base, 1
+            while Plan.objects.filter(slug=slug).exists():
+                number += 1
+                slug = f'{base}-{number}'
+            self.slug = slug
+        super().save(*args, **kwargs)
+
+    def to_record(self):
+        """Return the template-facing ``PlanRecord`` (expects ``with_relations()``)."""
+        fields = {name: getattr(self, name) for name in self.TEXT_FIELDS + self.FLAG_FIELDS}
+        return PlanRecord(
+            plan_name=self.plan_name,
+            slug=self.slug,
+            age_min=self.age_min,
+            age_max=self.age_max,
+            deductible_amount=self.deductible_amount,
+            oop_amount=self.oop_amount,
+            cities=tuple(link.city.name for link in self.city_links.all()),
+            tags=tuple(link.tag.label for link in self.tag_links.all()),
+            **fields,
+        )
+
+
+class PlanCity(models.Model):
+    plan = models.ForeignKey(Plan, related_name='city_links', on_delete=models.CASCADE)
+    city = models.ForeignKey(City, related_name='plan_links', on_delete=models.CASCADE)
+    order = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['order']
+        constraints = [
+            models.UniqueConstraint(fields=['plan', 'city'], name='unique_plan_city'),
+        ]
+        indexes = [
+            models.Index(fields=['city', 'plan'], name='plan_city_lookup_idx'),
+        ]
+
+
+class PlanTagging(models.Model):
+    plan = models.ForeignKey(Plan, related_name='tag_links', on_delete=models.CASCADE)
+    tag = models.ForeignKey(PlanTag, related_name='plan_links', on_delete=models.CASCADE)
+    order = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['order']
+        constraints = [
+            models.UniqueConstraint(fields=['plan', 'tag'], name='unique_plan_tag'),
+        ]
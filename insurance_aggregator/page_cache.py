@@ -0,0 +1,91 @@
+"""
+Shared-cache helpers for rendered pages and site content.
+
+Cache keys embed everything that can change a page: the sanitized request
+inputs, the catalog version and a change stamp per content model. Admin edits
+bump the stamp via signals (see ``signals.py``), which retires every entry
+built from the old content without having to find and delete it. Stamps are
+kept in the separate ``stamps`` cache, where culling page entries cannot
+evict them.
+
+Singleton content is read through two layers: this process's memory, then the
+shared cache, and only then the database. Both layers are checked against the
+current stamps, so an edit made through any worker is seen by all of them.
+Content is only read from the async views, so that helper is async;
+``achange_stamps`` is the async twin of ``change_stamps``.
+"""
+
+import hashlib
+import time
+
+from django.core.cache import cache, caches
+
+from .metrics import cache_lookup
+
+STAMP_PREFIX = 'insurance-buddy:stamp:'
+
+# Shared-cache lifetime of content entries; stamps retire them before that.
+CONTENT_CACHE_SECONDS = 24 * 60 * 60
+
+_MISSING = object()
+_local_content = {}
+
+
+def _stamp_key(model) -> str:
+    return STAMP_PREFIX + model._meta.label_lower
+
+
+def change_stamps(*models) -> tuple:
+    """Return the models' current change stamps, starting any that do not exist yet."""
+    stamps = caches['stamps']
+    keys = [_stamp_key(model) for model in models]
+    found = stamps.get_many(keys)
+    for key in keys:
+        if key not in found:
+            stamp = time.time_ns()
+            # add() keeps a stamp another worker wrote in the meantime.
+            found[key] = stamp if stamps.add(key, stamp, None) else stamps.get(key, stamp)
+    return tuple(found[key] for key in keys)
+
+
+async def achange_stamps(*models) -> tuple:
+    stamps = caches['stamps']
+    keys = [_stamp_key(model) for model in models]
+    found = await stamps.aget_many(keys)
+    for key in keys:
+        if key not in found:
+            stamp = time.time_ns()
+            found[key] = stamp if await stamps.aadd(key, stamp, None) else await stamps.aget(key, stamp)
+    return tuple(found[key] for key in keys)
+
+
+def bump_change_stamp(model) -> None:
+    caches['stamps'].set(_stamp_key(model), time.time_ns(), None)
+
+
+def cache_key(prefix: str, *parts) -> str:
+    digest = hashlib.md5(repr(parts).encode('utf-8')).hexdigest()
+    return f'insurance-buddy:{prefix}:{digest}'
+
+
+async def acached_content(name: str, models: tuple, loader):
+    """
+    Return ``await loader()`` from process memory or the shared cache.
+
+    The value is reloaded when any of ``models`` changed since it was stored.
+    Callers share the returned object and must not mutate it.
+    """
+    stamps = await achange_stamps(*models)
+    entry = _local_content.get(name)
+    local_hit = entry is not None and entry[0] == stamps
+    cache_lookup('content-memory', local_hit)
+    if local_hit:
+        return entry[1]
+    key = cache_key('content', name, stamps)
+    value = await cache.aget(key, _MISSING)
+    cache_lookup('content', value is not _MISSING)
+    if value is _MISSING:
+        value = await loader()
+        await cache.aset(key, value, CONTENT_CACHE_SECONDS)
+    _local_content[name] = (stamps, value)
+    return value
@@ -0,0 +1,292 @@
+"""
+Bitmap index over the normalized plan catalog.
+
+Plan ids are positions in the catalog list. Every posting list is stored as a
+Python ``int`` used as a bitset, so a (member, age, city) lookup is a few
+``&`` operations instead of a scan over every plan. Cost columns keep a
+precomputed price order that answers both "cost <= limit" and cheapest-first
+top-k without sorting per request.
+"""
+
+import heapq
+from bisect import bisect_right
+from collections.abc import Sequence
+from itertools import islice
+from typing import Iterator, Optional
+
+AGE_FLOOR = 0
+AGE_CEILING = 120
+
+COST_FIELDS = ('deductible_amount', 'oop_amount')
+
+# Cumulative cost bitmaps are kept every this many plans in price order.
+COST_BUCKET_SIZE = 256
+
+# A rebuilt catalog patches the previous postings when at most one plan in
+# this many changed position or content; past that a fresh build is cheaper.
+POSTING_PATCH_RATIO = 8
+
+SEGMENT_FIELDS = {
+    'adult': 'for_adult',
+    'child': 'for_child',
+    'family': 'supports_family',
+    'government': 'is_government',
+}
+
+
+def _to_bitmap(plan_ids, size: int) -> int:
+    buffer = bytearray((size + 7) // 8)
+    for plan_id in plan_ids:
+        buffer[plan_id >> 3] |= 1 << (plan_id & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def iter_bits(bits: int) -> Iterator[int]:
+    """Yield the positions of the set bits in ascending order."""
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+    for byte_index, byte in enumerate(data):
+        if not byte:
+            continue
+        base = byte_index << 3
+        for offset in range(8):
+            if byte >> offset & 1:
+                yield base + offset
+
+
+def count_bits(bits: int) -> int:
+    return bin(bits).count('1')
+
+
+def plan_age_bounds(plan) -> tuple:
+    min_age = plan.get('age_min') if isinstance(plan.get('age_min'), int) else AGE_FLOOR
+    max_age = plan.get('age_max') if isinstance(plan.get('age_max'), int) else AGE_CEILING
+    return min_age, max_age
+
+
+def cost_order(plans: list, field: str) -> list:
+    """Plan ids cheapest first, unparseable costs last, ties in catalog order."""
+    return sorted(
+        range(len(plans)),
+        key=lambda plan_id: (plans[plan_id].get(field) is None, plans[plan_id].get(field) or 0),
+    )
+
+
+class CostThresholds:
+    """Answers "cost <= limit" as a bitmap from one precomputed price order."""
+
+    def __init__(self, plans: list, field: str, order: list):
+        size = len(plans)
+        known = [plan_id for plan_id in order if plans[plan_id].get(field) is not None]
+        self.amounts = [plans[plan_id].get(field) for plan_id in known]
+        self.plan_ids = known
+        self.size = size
+        self.cumulative = [0]
+        for start in range(0, len(known), COST_BUCKET_SIZE):
+            chunk = _to_bitmap(known[start:start + COST_BUCKET_SIZE], size)
+            self.cumulative.append(self.cumulative[-1] | chunk)
+
+    def bits_at_most(self, limit: int) -> int:
+        position = bisect_right(self.amounts, limit)
+        bucket = position // COST_BUCKET_SIZE
+        partial = self.plan_ids[bucket * COST_BUCKET_SIZE:position]
+        return self.cumulative[bucket] | _to_bitmap(partial, self.size)
+
+
+def _build_postings(plans: list) -> tuple:
+    size = len(plans)
+    city_ids = {}
+    segment_ids = {segment: [] for segment in SEGMENT_FIELDS}
+    for plan_id, plan in enumerate(plans):
+        for city in plan.get('cities', []):
+            city_ids.setdefault(city, []).append(plan_id)
+        for segment, field in SEGMENT_FIELDS.items():
+            if plan.get(field):
+                segment_ids[segment].append(plan_id)
+    city_bits = {city: _to_bitmap(ids, size) for city, ids in city_ids.items()}
+    segment_bits = {segment: _to_bitmap(ids, size) for segment, ids in segment_ids.items()}
+    return city_bits, segment_bits
+
+
+def _patch_postings(previous: 'PlanIndex', plans: list, stale: list) -> tuple:
+    """Previous city and segment postings with the ``stale`` plan ids redone for ``plans``."""
+    old_plans = previous.plans
+    city_bits = dict(previous.city_bits)
+    segment_bits = dict(previous.segment_bits)
+    for plan_id in stale:
+        bit = 1 << plan_id
+        if plan_id < len(old_plans):
+            old_plan = old_plans[plan_id]
+            for city in old_plan.get('cities', []):
+                city_bits[city] &= ~bit
+            for segment, field in SEGMENT_FIELDS.items():
+                if old_plan.get(field):
+                    segment_bits[segment] &= ~bit
+        if plan_id < len(plans):
+            plan = plans[plan_id]
+            for city in plan.get('cities', []):
+                city_bits[city] = city_bits.get(city, 0) | bit
+            for segment, field in SEGMENT_FIELDS.items():
+                if plan.get(field):
+                    segment_bits[segment] |= bit
+    # A fresh build has no entry for a city that no plan serves any more.
+    return {city: bits for city, bits in city_bits.items() if bits}, segment_bits
+
+
+class PlanIndex:
+    """Posting bitmaps for city, member segment and age over one catalog list."""
+
+    def __init__(self, plans: list, postings: Optional[tuple] = None):
+        self.plans = plans
+        size = len(plans)
+        self.all_bits = (1 << size) - 1
+        self.city_bits, self.segment_bits = postings or _build_postings(plans)
+
+        # Age boundaries are the points where the covering set changes: a plan
+        # enters at ``age_min`` and leaves at ``age_max + 1``.
+        age_toggles = {}
+        for plan_id, plan in enumerate(plans):
+            min_age, max_age = plan_age_bounds(plan)
+            if min_age <= max_age:
+                age_toggles.setdefault(min_age, []).append(plan_id)
+                age_toggles.setdefault(max_age + 1, []).append(plan_id)
+
+        # Sweep the sorted boundaries once; each elementary interval
+        # [boundary[i], boundary[i + 1]) maps to the bitmap of plans covering it.
+        self.age_boundaries = sorted(age_toggles)
+        self.age_interval_bits = []
+        active = 0
+        for boundary in self.age_boundaries:
+            active ^= _to_bitmap(age_toggles[boundary], size)
+            self.age_interval_bits.append(active)
+
+        self.cost_orders = {field: cost_order(plans, field) for field in COST_FIELDS}
+        self.cost_ranks = {}
+        for field, order in self.cost_orders.items():
+            ranks = [0] * size
+            for rank, plan_id in enumerate(order):
+                ranks[plan_id] = rank
+            self.cost_ranks[field] = ranks
+        self.cost_thresholds = {
+            field: CostThresholds(plans, field, order) for field, order in self.cost_orders.items()
+        }
+
+    @classmethod
+    def updated(cls, previous: 'PlanIndex', plans: list) -> 'PlanIndex':
+        """
+        Index ``plans``, reusing ``previous``'s postings where plans kept their place.
+
+        Plans are matched by identity, so this pays off when ``plans`` reuses
+        the previous records. Only the city and segment postings of plan ids
+        whose record changed are redone; the age intervals and cost orders are
+        rebuilt from the records.
+        """
+        old_plans = previous.plans
+        stale = [
+            plan_id
+            for plan_id in range(max(len(plans), len(old_plans)))
+            if plan_id >= len(plans) or plan_id >= len(old_plans) or plans[plan_id] is not old_plans[plan_id]
+        ]
+        if len(stale) * POSTING_PATCH_RATIO > len(plans):
+            # Inserting or removing near the top shifts every later plan id.
+            return cls(plans)
+        return cls(plans, _patch_postings(previous, plans, stale))
+
+    def __len__(self) -> int:
+        return len(self.plans)
+
+    def age_bucket(self, age: int) -> int:
+        """Elementary age interval holding ``age``; ages in one bucket match the same plans."""
+        return bisect_right(self.age_boundaries, age)
+
+    def age_bits(self, age: int) -> int:
+        position = bisect_right(self.age_boundaries, age) - 1
+        if position < 0:
+            return 0
+        return self.age_interval_bits[position]
+
+    def match_bits(
+        self,
+        member: str,
+        age: Optional[int],
+        city: Optional[str],
+        max_deductible: Optional[int] = None,
+        max_oop: Optional[int] = None,
+    ) -> int:
+        bits = self.segment_bits.get(member, self.all_bits)
+        if city:
+            bits &= self.city_bits.get(city, 0)
+        if age is not None:
+            bits &= self.age_bits(age)
+        if max_deductible is not None:
+            bits &= self.cost_thresholds['deductible_amount'].bits_at_most(max_deductible)
+        if max_oop is not None:
+            bits &= self.cost_thresholds['oop_amount'].bits_at_most(max_oop)
+        return bits
+
+    def query(
+        self,
+        member: str,
+        age: Optional[int],
+        city: Optional[str],
+        max_deductible: Optional[int] = None,
+        max_oop: Optional[int] = None,
+    ) -> 'BitmapSelection':
+        """Return the matching plans in catalog order, mirroring ``filter_plans``."""
+        return BitmapSelection(self, self.match_bits(member, age, city, max_deductible, max_oop))
+
+    def top(self, bits: int, field: str, limit: int, count: int) -> list:
+        """Cheapest ``limit`` plans among ``bits`` by a precomputed cost order."""
+        plans = self.plans
+        if count * 8 < len(plans):
+            # Sparse result: a heap over the matches beats walking the order.
+            ranks = self.cost_ranks[field]
+            return [plans[plan_id] for plan_id in heapq.nsmallest(limit, iter_bits(bits), key=ranks.__getitem__)]
+        membership = bits.to_bytes((len(plans) + 7) // 8, 'little')
+        selected = []
+        for plan_id in self.cost_orders[field]:
+            if membership[plan_id >> 3] >> (plan_id & 7) & 1:
+                selected.append(plans[plan_id])
+                if len(selected) == limit:
+                    break
+        return selected
+
+
+class BitmapSelection(Sequence):
+    """Lazy sequence of the plans in a result bitmap, in catalog order."""
+
+    def __init__(self, index: PlanIndex, bits: int):
+        self.index = index
+        self.bits = bits
+        self._plan_ids = None
+        self._count = None
+
+    @property
+    def plan_ids(self) -> list:
+        if self._plan_ids is None:
+            self._plan_ids = list(iter_bits(self.bits))
+        return self._plan_ids
+
+    def __len__(self) -> int:
+        if self._count is None:
+            self._count = count_bits(self.bits)
+        return self._count
+
+    def __getitem__(self, position):
+        plans = self.index.plans
+        if isinstance(position, slice):
+            if self._plan_ids is None and not position.start and position.step is None and position.stop is not None:
+                # Leading page: decode only as many bits as we need.
+                return [plans[plan_id] for plan_id in islice(iter_bits(self.bits), max(position.stop, 0))]
+            return [plans[plan_id] for plan_id in self.plan_ids[position]]
+        return plans[self.plan_ids[position]]
+
+    def top(self, field: str, limit: int) -> list:
+        return self.index.top(self.bits, field, limit, len(self))
+
+    def page(self, after: Optional[int], limit: int) -> list:
+        """``(plan_id, plan)`` for up to ``limit`` matches after plan id ``after``."""
+        bits = self.bits
+        if after is not None:
+            bits = bits >> (after + 1) << (after + 1)
+        plans = self.index.plans
+        return [(plan_id, plans[plan_id]) for plan_id in islice(iter_bits(bits), limit)]
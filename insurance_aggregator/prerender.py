@@ -0,0 +1,186 @@
+"""
+Static copies of the marketing pages.
+
+``home`` and ``about`` depend only on content edited in the admin.
+``manage.py prerender_pages`` renders them into ``PRERENDERED_PAGES_DIR``,
+and they are rendered again after any of that content is saved or deleted. ``PrerenderedPageMiddleware`` serves them
+through WhiteNoise without reaching a view. Responses come with:
+
+- gzip variants, and Brotli when it is installed;
+- an ETag taken from a hash of the page;
+- answers to conditional requests.
+
+Every other URL and method goes on to Django as before. The contact page is
+left out: its form carries a per-visitor CSRF token, which a shared static
+copy cannot.
+
+Every build is written to a new directory and published by atomically
+replacing ``CURRENT``. Workers check that file on each request, so a rebuild
+made by one worker is served by all of them from their next request.
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import transaction
+from django.http import HttpRequest
+from django.urls import resolve, reverse
+from whitenoise.base import WhiteNoise
+from whitenoise.compress import Compressor
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .models import (
+    AboutPageContent,
+    AboutValue,
+    HomeFeature,
+    HomePageContent,
+    HomeStat,
+    PartnerOrganization,
+)
+
+logger = logging.getLogger(__name__)
+
+# URL names of the pages rendered ahead of time.
+PAGES = ('home', 'about')
+
+# Models whose edits trigger a rebuild.
+PRERENDERED_MODELS = (
+    HomePageContent,
+    HomeStat,
+    HomeFeature,
+    PartnerOrganization,
+    AboutPageContent,
+    AboutValue,
+)
+
+POINTER_NAME = 'CURRENT'
+
+# Older builds are kept briefly so responses already streaming from them finish.
+KEEP_BUILDS = 3
+
+
+def render_page(name: str) -> bytes:
+    """Run the page's view for a plain GET and return the HTML."""
+    request = HttpRequest()
+    request.method = 'GET'
+    request.path = request.path_info = reverse(name)
+    request.META = {'REQUEST_METHOD': 'GET', 'SERVER_NAME': 'localhost', 'SERVER_PORT': '80'}
+    request.resolver_match = match = resolve(request.path_info)
+    view = async_to_sync(match.func) if iscoroutinefunction(match.func) else match.func
+    response = view(request, *match.args, **match.kwargs)
+    if response.status_code != 200:
+        raise RuntimeError(f'{request.path} returned HTTP {response.status_code}')
+    return response.content
+
+
+def _page_file(url: str) -> str:
+    return url.strip('/') + '/index.html' if url != '/' else 'index.html'
+
+
+def build_pages(root: Optional[Path] = None) -> Path:
+    """Render every page into a new build under ``root``, publish it and return its directory."""
+    root = Path(root or settings.PRERENDERED_PAGES_DIR)
+    root.mkdir(parents=True, exist_ok=True)
+    # Hex nanoseconds keep build names sortable; the pid separates concurrent rebuilds.
+    build = root / f'{time.time_ns():x}-{os.getpid()}'
+    compressor = Compressor(quiet=True)
+    for name in PAGES:
+        path = build / _page_file(reverse(name))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(render_page(name))
+        list(compressor.compress(str(path)))
+
+    handle, temporary = tempfile.mkstemp(dir=root, prefix='.tmp-')
+    with os.fdopen(handle, 'w', encoding='utf-8') as pointer:
+        pointer.write(build.name)
+    os.replace(temporary, root / POINTER_NAME)
+
+    builds = sorted(entry for entry in root.iterdir() if entry.is_dir())
+    for stale in builds[:-KEEP_BUILDS]:
+        shutil.rmtree(stale, ignore_errors=True)
+    return build
+
+
+# Rebuilds requested and completed; one rebuild after a commit covers every
+# save made in that transaction, such as a page and its inline rows.
+_rebuilds = {'requested': 0, 'built': 0}
+_rebuild_lock = threading.Lock()
+
+
+def _rebuild() -> None:
+    with _rebuild_lock:
+        target = _rebuilds['requested']
+        if _rebuilds['built'] >= target:
+            return
+        try:
+            build_pages()
+        except Exception:
+            logger.exception('Could not pre-render pages; serving the previous build')
+        _rebuilds['built'] = target
+
+
+def schedule_rebuild(sender, **kwargs) -> None:
+    """``post_save``/``post_delete`` receiver that rebuilds the pages once the change is committed."""
+    if not settings.PRERENDERED_PAGES_DIR:
+        return
+    with _rebuild_lock:
+        _rebuilds['requested'] += 1
+    transaction.on_commit(_rebuild)
+
+
+def _add_page_headers(headers, path: str, url: str) -> None:
+    with open(path, 'rb') as page:
+        headers['ETag'] = f'"{hashlib.sha256(page.read()).hexdigest()[:32]}"'
+    # Views get this from XFrameOptionsMiddleware, which these pages never reach.
+    headers['X-Frame-Options'] = settings.X_FRAME_OPTIONS
+
+
+class PrerenderedPageMiddleware:
+    def __init__(self, get_response):
+        if not settings.PRERENDERED_PAGES_DIR:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.root = Path(settings.PRERENDERED_PAGES_DIR)
+        self.pages = {reverse(name): name for name in PAGES}
+        # (pointer identity, WhiteNoise over that build) for the build being served.
+        self._build = (None, None)
+
+    def _files(self) -> Optional[WhiteNoise]:
+        try:
+            stat = os.stat(self.root / POINTER_NAME)
+        except FileNotFoundError:
+            return None
+        # os.replace gives every publish a new inode.
+        identity = (stat.st_ino, stat.st_mtime_ns)
+        loaded_identity, files = self._build
+        if identity != loaded_identity:
+            build = (self.root / POINTER_NAME).read_text(encoding='utf-8').strip()
+            files = WhiteNoise(
+                None,
+                max_age=0 if settings.DEBUG else 60,
+                allow_all_origins=False,
+                index_file=True,
+                add_headers_function=_add_page_headers,
+            )
+            files.add_files(str(self.root / build))
+            self._build = (identity, files)
+        return files
+
+    def __call__(self, request):
+        if request.method in ('GET', 'HEAD') and request.path_info in self.pages:
+            files = self._files()
+            static_file = files.files.get(request.path_info) if files else None
+            if static_file is not None:
+                request.prerendered_page = self.pages[request.path_info]
+                return WhiteNoiseMiddleware.serve(static_file, request)
+        return self.get_response(request)
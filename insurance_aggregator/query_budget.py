@@ -0,0 +1,117 @@
+"""
+Per-view SQL query budgets.
+
+Views declare the most queries a cold request may run with ``@query_budget``.
+In development ``QueryBudgetMiddleware`` counts and times the queries behind
+every request and logs an error, or raises when ``QUERY_BUDGET_STRICT`` is set,
+as soon as a view goes over budget. The test suite requests every budgeted URL
+from ``budgeted_urls()`` with caches disabled and fails on any overrun
+(``manage.py check_query_budgets`` runs just those tests).
+"""
+
+import logging
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.urls import URLPattern, get_resolver, reverse
+
+logger = logging.getLogger(__name__)
+
+
+# Query strings requested on top of each budgeted view's bare URL.
+EXTRA_QUERIES = {
+    'product': [
+        '?member=child&age=10',
+        '?member=family&age=40&sort=oop&max_deductible=1000',
+    ],
+    'compare': [
+        '?ids=yale-university-student-health-plan-e8eab6fa,student-medicover-elite-uhcsr-67d0fdf5',
+        '?ids=worldtrips-student-secure-smart-4630d697&ids=no-such-plan&ids=student-medicover-prime-100-uhcsr-d3583011'
+        '&ids=student-medicover-prime-500-uhcsr-106f5151&ids=student-medicover-supreme-uhcsr-top-tier-6033968c',
+    ],
+    'api-plans': [
+        '?member=adult&age=24&limit=100',
+        '?fields=plan_name,cities&max_oop=5000',
+        '?city=new+havn&member=child',
+    ],
+    'api-cities': ['?q=new', '?q=h&limit=50', '?q=new&member=child&age=10'],
+    'api-facets': ['?member=adult&age=24&city=new+havn', '?member=family&limit=50'],
+}
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(queries: int, database: Optional[int] = None):
+    """Declare a view's query budget; ``database`` applies when plans come from the Plan table."""
+
+    def decorator(view):
+        view.query_budget = (queries, queries if database is None else database)
+        return view
+
+    return decorator
+
+
+def budget_for(view) -> Optional[int]:
+    budgets = getattr(view, 'query_budget', None)
+    if budgets is None:
+        return None
+    return budgets[1] if settings.PLAN_CATALOG_SOURCE == 'database' else budgets[0]
+
+
+def budgeted_urls() -> list:
+    """Every URL with a ``@query_budget`` view, plus its ``EXTRA_QUERIES``."""
+    urls = []
+    for pattern in get_resolver().url_patterns:
+        if not isinstance(pattern, URLPattern) or not hasattr(pattern.callback, 'query_budget'):
+            continue
+        path = reverse(pattern.name)
+        urls.append(path)
+        urls.extend(path + query for query in EXTRA_QUERIES.get(pattern.name, []))
+    return urls
+
+
+class QueryRecorder:
+    """``execute_wrapper`` that counts queries and their total duration."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+class QueryBudgetMiddleware:
+    def __init__(self, get_response):
+        if not settings.QUERY_BUDGETS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        response['X-Query-Count'] = str(recorder.count)
+        budget = getattr(request, '_query_budget', None)
+        if budget is not None and recorder.count > budget:
+            message = (
+                f'{request.path} ran {recorder.count} SQL queries ({recorder.duration * 1000:.1f} ms), '
+                f'over its budget of {budget}'
+            )
+            if settings.QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(message)
+            logger.error(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._query_budget = budget_for(view_func)
@@ -69,8 +69,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'insurance_aggregator.metrics.MetricsMiddleware',
+    'insurance_aggregator.timing.ServerTimingMiddleware',
+    'insurance_aggregator.query_budget.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'insurance_aggregator.prerender.PrerenderedPageMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -103,15 +107,48 @@ WSGI_APPLICATION = 'insurance_aggregator.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# Under ASGI every request runs its queries on its own thread, so persistent
+# connections pile up; set DJANGO_CONN_MAX_AGE=0 there.
 DATABASES = {
     'default': dj_database_url.config(
         default=f'sqlite:///{BASE_DIR / "db.sqlite3"}',
-        conn_max_age=600,
+        conn_max_age=int(os.environ.get('DJANGO_CONN_MAX_AGE', '600')),
         conn_health_checks=True,
     )
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# File-based by default so every worker on the host shares cached pages and
+# sees the same invalidations. Content change stamps live in their own
+# 'stamps' cache, so culling pages can never drop a stamp and retire content.
+
+CACHE_BACKEND = os.environ.get('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache')
+CACHE_LOCATION = os.environ.get('DJANGO_CACHE_LOCATION', str(BASE_DIR / 'build' / 'cache'))
+FILE_BASED_CACHE = CACHE_BACKEND.endswith('.FileBasedCache')
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': CACHE_LOCATION,
+    },
+    'stamps': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.environ.get(
+            'DJANGO_STAMP_CACHE_LOCATION',
+            str(BASE_DIR / 'build' / 'cache-stamps') if FILE_BASED_CACHE else CACHE_LOCATION,
+        ),
+    },
+}
+if FILE_BASED_CACHE:
+    # Past MAX_ENTRIES files, a write deletes 1/CULL_FREQUENCY of them at random.
+    CACHES['default']['OPTIONS'] = {
+        'MAX_ENTRIES': int(os.environ.get('DJANGO_CACHE_MAX_ENTRIES', '5000')),
+        'CULL_FREQUENCY': 4,
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -150,9 +187,74 @@ STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
+# Where the plan builder reads plans from: 'file' (plans.json in memory) or
+# 'database' (the Plan table populated by `manage.py import_plans`).
+PLAN_CATALOG_SOURCE = os.environ.get('PLAN_CATALOG_SOURCE', 'file').lower()
+
+# Query engine behind filter_plans: 'bitmap' (PlanIndex) or 'columnar' (NumPy).
+PLAN_CATALOG_MODE = os.environ.get('PLAN_CATALOG_MODE', 'bitmap').lower()
+
+# Seconds a rendered /product/ page stays cached; 0 disables the page cache
+# (the default with DEBUG, so template edits show up immediately).
+# Entries are keyed on the catalog version and content change stamps, so
+# edits never wait for this to expire.
+PRODUCT_PAGE_CACHE_SECONDS = int(os.environ.get('PRODUCT_PAGE_CACHE_SECONDS', '0' if DEBUG else '3600'))
+
+# Plans whose card and comparison column stay pre-rendered per catalog
+# version; 0 renders them per request (the default with DEBUG, so template
+# edits show up immediately).
+PLAN_FRAGMENT_CACHE_SIZE = int(os.environ.get('PLAN_FRAGMENT_CACHE_SIZE', '0' if DEBUG else '4096'))
+
+# Where `manage.py prerender_pages` and admin edits write static copies of the
+# home and about pages; empty renders them per request (the default
+# with DEBUG, so template edits show up immediately).
+PRERENDERED_PAGES_DIR = os.environ.get('PRERENDERED_PAGES_DIR', '' if DEBUG else str(BASE_DIR / 'build' / 'pages'))
+
+# Seconds between checks of plans.json for changes; 0 disables hot reload.
+PLAN_CATALOG_RELOAD_INTERVAL = float(os.environ.get('PLAN_CATALOG_RELOAD_INTERVAL', '30'))
+
+# Precompiled catalog written by `manage.py build_catalog_snapshot`; empty disables.
+PLAN_CATALOG_SNAPSHOT_PATH = os.environ.get(
+    'PLAN_CATALOG_SNAPSHOT_PATH',
+    str(BASE_DIR / 'build' / 'plan_catalog.snapshot'),
+)
+
 SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Count SQL queries per request and flag views over their @query_budget
+# (on by default with DEBUG). Strict mode raises instead of logging.
+QUERY_BUDGETS_ENABLED = os.environ.get('QUERY_BUDGETS_ENABLED', str(DEBUG)).lower() == 'true'
+QUERY_BUDGET_STRICT = os.environ.get('QUERY_BUDGET_STRICT', 'False').lower() == 'true'
+
+# Share of requests that get a Server-Timing header and a timing log line;
+# 0 removes the middleware. Every request is timed with DEBUG.
+SERVER_TIMING_SAMPLE_RATE = float(os.environ.get('SERVER_TIMING_SAMPLE_RATE', '1' if DEBUG else '0.05'))
+# The timing log lines are written at INFO; set this to INFO to see them.
+# The default keeps tests, commands and local runs quiet.
+SERVER_TIMING_LOG_LEVEL = os.environ.get('SERVER_TIMING_LOG_LEVEL', 'WARNING')
+
+# Where each worker writes its metrics for /metrics to merge; empty keeps
+# them per process. Workers write at most every METRICS_FLUSH_SECONDS.
+METRICS_DIR = os.environ.get('METRICS_DIR', str(BASE_DIR / 'build' / 'metrics'))
+METRICS_FLUSH_SECONDS = float(os.environ.get('METRICS_FLUSH_SECONDS', '5'))
+# /metrics requires an "Authorization: Bearer <token>" header. Without a
+# token it is only served with DEBUG.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'insurance_aggregator.timing': {
+            'handlers': ['console'], 'level': SERVER_TIMING_LOG_LEVEL, 'propagate': False,
+        },
+    },
+}
@@ -0,0 +1,47 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+
+from .models import (
+    AboutPageContent,
+    AboutValue,
+    AudienceSegment,
+    ContactPageContent,
+    HomeFeature,
+    HomePageContent,
+    HomeStat,
+    PartnerOrganization,
+    ProductPageContent,
+)
+from .page_cache import bump_change_stamp
+from .prerender import PRERENDERED_MODELS, schedule_rebuild
+from .timing import install_query_timer
+
+# Content models whose edits invalidate cached content and pages.
+STAMPED_MODELS = (
+    HomePageContent,
+    HomeStat,
+    HomeFeature,
+    PartnerOrganization,
+    AboutPageContent,
+    AboutValue,
+    ProductPageContent,
+    AudienceSegment,
+    ContactPageContent,
+)
+
+
+def bump_stamp(sender, **kwargs):
+    # After the commit, so nothing can cache the old content under the new stamp.
+    transaction.on_commit(lambda: bump_change_stamp(sender))
+
+
+def connect_signals() -> None:
+    for model in STAMPED_MODELS:
+        post_save.connect(bump_stamp, sender=model, dispatch_uid=f'stamp-save-{model._meta.label_lower}')
+        post_delete.connect(bump_stamp, sender=model, dispatch_uid=f'stamp-delete-{model._meta.label_lower}')
+    # Connected after the stamps so the rebuild reads the new content.
+    for model in PRERENDERED_MODELS:
+        post_save.connect(schedule_rebuild, sender=model, dispatch_uid=f'prerender-save-{model._meta.label_lower}')
+        post_delete.connect(schedule_rebuild, sender=model, dispatch_uid=f'prerender-delete-{model._meta.label_lower}')
+    connection_created.connect(install_query_timer, dispatch_uid='server-timing-db')
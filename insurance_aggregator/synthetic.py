@@ -0,0 +1,147 @@
+"""
+Synthetic plan feeds in the raw ``plans.json`` schema.
+
+Each entry starts from a plan in the bundled feed and gets a unique name, a
+random set of cities, and re-drawn costs and eligibility. Generated catalogs
+of any size therefore go through the same normalization, classification and
+indexing paths as the real data.
+
+Popularity is skewed the way real feeds are. Templates, synthetic carriers and
+cities are drawn from Zipf-like weights, so a few providers and metro areas
+dominate and a long tail appears only a handful of times. Text fields pick up
+the ``:contentReference[...]`` citation noise the scraped feed carries.
+"""
+
+import random
+from bisect import bisect_left
+from itertools import accumulate
+from typing import Iterator
+
+from .data_loader import DATA_PATH, iter_raw_entries
+
+CAMPUS_CITIES = [
+    'New Haven, CT', 'Cambridge, MA', 'Boston, MA', 'New York, NY', 'Ithaca, NY',
+    'Philadelphia, PA', 'Pittsburgh, PA', 'Princeton, NJ', 'Providence, RI', 'Hanover, NH',
+    'Baltimore, MD', 'Washington, DC', 'Durham, NC', 'Chapel Hill, NC', 'Atlanta, GA',
+    'Gainesville, FL', 'Miami, FL', 'Nashville, TN', 'Ann Arbor, MI', 'Chicago, IL',
+    'Evanston, IL', 'Champaign, IL', 'Madison, WI', 'Minneapolis, MN', 'Columbus, OH',
+    'Bloomington, IN', 'West Lafayette, IN', 'St. Louis, MO', 'Austin, TX', 'Houston, TX',
+    'College Station, TX', 'Boulder, CO', 'Salt Lake City, UT', 'Tempe, AZ', 'Seattle, WA',
+    'Portland, OR', 'Berkeley, CA', 'Stanford, CA', 'Los Angeles, CA', 'San Diego, CA',
+]
+
+STATE_CODES = [
+    'AL', 'AZ', 'CA', 'CO', 'CT', 'FL', 'GA', 'IA', 'IL', 'IN', 'KS', 'KY', 'MA', 'MD', 'MI',
+    'MN', 'MO', 'NC', 'NJ', 'NY', 'OH', 'OK', 'OR', 'PA', 'SC', 'TN', 'TX', 'UT', 'VA', 'WA', 'WI',
+]
+
+CARRIER_PREFIXES = ['Harbor', 'Summit', 'Beacon', 'Keystone', 'Pioneer', 'Liberty', 'Cascade', 'Meridian']
+CARRIER_SUFFIXES = ['Health', 'Mutual', 'Care', 'Assurance', 'Benefit Partners']
+PLAN_TIERS = ['Bronze', 'Silver', 'Gold', 'Platinum', 'Essential', 'Premier', 'Student Basic', 'Student Plus']
+
+# (age_min, age_max) pairs weighted roughly like the bundled feed.
+AGE_RANGES = [
+    ((18, 64), 17), ((18, None), 14), ((0, 64), 4), ((14, 64), 3), ((17, 64), 2), ((21, 25), 2),
+    ((0, 18), 1), ((13, 19), 1), ((0, 25), 1), ((0, 69), 1), ((65, None), 1), ((None, None), 1),
+]
+CITIES_PER_PLAN = [(1, 60), (2, 20), (3, 10), (5, 6), (12, 3), (40, 1)]
+DEDUCTIBLES = [0, 50, 100, 250, 500, 750, 1000, 1500, 2500, 5000, 7500]
+OUT_OF_POCKET_LIMITS = [1000, 2500, 3000, 4500, 6350, 7500, 9100, 10000]
+
+NOISY_FIELDS = (
+    'overall-deductible',
+    'services-covered-before-deductible',
+    'specific-service-deductible',
+    'out-of-pocket-limit-individual',
+    'out-of-pocket-limit-family',
+    'out-of-pocket-limit-hospital-surgery-combined',
+    'excluded-from-out-of-pocket-limit',
+)
+
+
+def synthetic_cities(count: int) -> list:
+    """Return ``count`` distinct "City, ST" labels, real campus towns first."""
+    cities = CAMPUS_CITIES[:count]
+    for number in range(count - len(cities)):
+        cities.append(f'Town {number + 1}, {STATE_CODES[number % len(STATE_CODES)]}')
+    return cities
+
+
+def synthetic_carriers() -> list:
+    return [f'{prefix} {suffix}' for prefix in CARRIER_PREFIXES for suffix in CARRIER_SUFFIXES]
+
+
+def zipf_weights(count: int, exponent: float) -> list:
+    """Cumulative weights for ``random.choices``; rank ``r`` is drawn ~ ``1 / r**exponent``."""
+    return list(accumulate(1 / (rank ** exponent) for rank in range(1, count + 1)))
+
+
+def _sample_distinct(rng: random.Random, population: list, cum_weights: list, size: int) -> list:
+    """Draw ``size`` distinct items by weight without materializing the population per draw."""
+    size = min(size, len(population))
+    total = cum_weights[-1]
+    chosen = {}
+    while len(chosen) < size:
+        position = bisect_left(cum_weights, rng.random() * total)
+        chosen.setdefault(position, population[position])
+    return list(chosen.values())
+
+
+def _weighted(options: list) -> tuple:
+    values = [value for value, _ in options]
+    return values, list(accumulate(weight for _, weight in options))
+
+
+def iter_synthetic_entries(
+    count: int,
+    seed: int = 0,
+    city_count: int = 500,
+    noise: float = 0.2,
+    carrier_share: float = 0.3,
+    skew: float = 1.1,
+) -> Iterator[dict]:
+    """
+    Yield ``count`` raw plan entries; the same arguments yield the same feed.
+
+    ``noise`` is the chance that a text field gets a citation marker, and
+    ``carrier_share`` the fraction of plans renamed to a synthetic carrier.
+    ``skew`` is the Zipf exponent for template, carrier and city popularity.
+    """
+    rng = random.Random(seed)
+    templates = list(iter_raw_entries(DATA_PATH))
+    rng.shuffle(templates)
+    template_weights = zipf_weights(len(templates), skew)
+    carriers = synthetic_carriers()
+    rng.shuffle(carriers)
+    carrier_weights = zipf_weights(len(carriers), skew)
+    cities = synthetic_cities(city_count)
+    city_weights = zipf_weights(len(cities), skew)
+    age_ranges, age_weights = _weighted(AGE_RANGES)
+    city_sizes, city_size_weights = _weighted(CITIES_PER_PLAN)
+
+    citation = 0
+    for number in range(count):
+        entry = dict(rng.choices(templates, cum_weights=template_weights)[0])
+        if rng.random() < carrier_share:
+            carrier = rng.choices(carriers, cum_weights=carrier_weights)[0]
+            entry['plan_name'] = f'{carrier} ({rng.choice(PLAN_TIERS)} Plan)'
+        # A parenthesized suffix keeps the provider prefix of the name.
+        entry['plan_name'] = f"{entry['plan_name']} (variant {number + 1})"
+        size = rng.choices(city_sizes, cum_weights=city_size_weights)[0]
+        entry['cities'] = _sample_distinct(rng, cities, city_weights, size)
+        entry['age_min'], entry['age_max'] = rng.choices(age_ranges, cum_weights=age_weights)[0]
+        entry['for-adult'] = rng.random() < 0.85
+        entry['for-child'] = rng.random() < 0.3
+        entry['overall-deductible'] = f'${rng.choice(DEDUCTIBLES):,} per year'
+        limit = rng.choice(OUT_OF_POCKET_LIMITS)
+        if rng.random() < 0.05:
+            entry['out-of-pocket-limit-individual'] = 'No fixed maximum'
+        else:
+            entry['out-of-pocket-limit-individual'] = f'${limit:,}'
+        entry['out-of-pocket-limit-family'] = f'${limit * 2:,}'
+        for field in NOISY_FIELDS:
+            value = entry.get(field)
+            if isinstance(value, str) and ':contentReference[' not in value and rng.random() < noise:
+                entry[field] = f'{value}:contentReference[oaicite:{citation}]{{index={citation}}}'
+                citation += 1
+        yield entry
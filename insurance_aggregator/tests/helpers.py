@@ -0,0 +1,7 @@
+# The manifest storage needs collectstatic, which tests do not run.
+PLAIN_STATIC = 'django.contrib.staticfiles.storage.StaticFilesStorage'
+
+LOCAL_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests'},
+    'stamps': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-stamps'},
+}
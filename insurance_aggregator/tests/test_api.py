@@ -0,0 +1,57 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from insurance_aggregator.city_index import CityIndex
+from insurance_aggregator.facets import PlanFacets
+
+from .helpers import LOCAL_CACHES
+
+PLANS = [
+    {'plan_name': 'Adult A', 'provider': 'Acme', 'for_adult': True, 'cities': ['Newark, NJ']},
+    {'plan_name': 'Adult B', 'provider': 'Acme', 'for_adult': True, 'cities': ['Newark, NJ']},
+    {'plan_name': 'Child A', 'provider': 'Beta', 'for_child': True, 'cities': ['New Haven, CT', 'Newark, NJ']},
+    {'plan_name': 'Child B', 'provider': 'Beta', 'for_child': True, 'cities': ['New Haven, CT']},
+    {'plan_name': 'Child C', 'provider': 'Beta', 'for_child': True, 'cities': ['New Haven, CT']},
+    {'plan_name': 'Adult C', 'provider': 'Gamma', 'for_adult': True, 'cities': ['New York, NY']},
+]
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class CityAutocompleteTests(SimpleTestCase):
+    def setUp(self):
+        source = SimpleNamespace(version=1, city_index=CityIndex.from_plans(PLANS), facets=PlanFacets(PLANS))
+        patcher = mock.patch('insurance_aggregator.api.get_plan_source', return_value=source)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def results(self, **params):
+        response = self.client.get('/api/cities/', params)
+        self.assertEqual(response.status_code, 200)
+        return [(match['city'], match['plan_count']) for match in response.json()['results']]
+
+    def test_unfiltered_matches_rank_by_catalog_counts(self):
+        self.assertEqual(
+            self.results(q='new'),
+            [('New Haven, CT', 3), ('Newark, NJ', 3), ('New York, NY', 1)],
+        )
+
+    def test_member_filter_reranks_and_drops_cities_without_plans(self):
+        self.assertEqual(self.results(q='new', member='child'), [('New Haven, CT', 3), ('Newark, NJ', 1)])
+        self.assertEqual(self.results(q='new', member='adult'), [('Newark, NJ', 2), ('New York, NY', 1)])
+
+    def test_empty_query_with_filter_returns_top_filtered_cities(self):
+        self.assertEqual(self.results(member='child', limit=1), [('New Haven, CT', 3)])
+
+    def test_invalid_age_is_rejected(self):
+        for url in ('/api/cities/', '/api/facets/', '/api/plans/'):
+            with self.subTest(url=url):
+                response = self.client.get(url, {'age': 'old'})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {'error': 'age must be an integer.'})
+
+    def test_invalid_cost_limit_is_rejected(self):
+        response = self.client.get('/api/plans/', {'max_oop': 'lots'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'max_oop must be a whole dollar amount.'})
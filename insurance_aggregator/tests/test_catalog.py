@@ -0,0 +1,73 @@
+import gc
+import json
+import tempfile
+import weakref
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from insurance_aggregator.catalog import CatalogHolder, DatabasePlanIndex, _reset_holders_after_fork
+from insurance_aggregator.models import Plan
+
+from .helpers import LOCAL_CACHES, PLAIN_STATIC
+
+
+class CatalogHolderForkTests(SimpleTestCase):
+    def test_holders_are_not_kept_alive_by_the_fork_hook(self):
+        holder = CatalogHolder(check_interval=0)
+        reference = weakref.ref(holder)
+        del holder
+        gc.collect()
+        self.assertIsNone(reference())
+
+    def test_fork_hook_resets_every_live_holder(self):
+        holders = [CatalogHolder(check_interval=0) for _ in range(2)]
+        for holder in holders:
+            holder._watcher = object()
+        _reset_holders_after_fork()
+        for holder in holders:
+            self.assertIsNone(holder._watcher)
+
+
+class DatabasePlanIndexTests(TestCase):
+    def setUp(self):
+        Plan.objects.create(plan_name='Campus Plan', for_adult=True)
+        Plan.objects.create(plan_name='Family Plan', for_adult=True, for_child=True)
+
+    def test_deleting_a_plan_changes_the_version_and_facets(self):
+        before = DatabasePlanIndex()
+        self.assertEqual(before.facets.summary('', None, None)['plan_count'], 2)
+
+        Plan.objects.filter(plan_name='Campus Plan').delete()
+
+        after = DatabasePlanIndex()
+        self.assertNotEqual(after.version, before.version)
+        self.assertEqual(after.facets.summary('', None, None)['plan_count'], 1)
+
+
+@override_settings(
+    CACHES=LOCAL_CACHES, STATICFILES_STORAGE=PLAIN_STATIC, PRODUCT_PAGE_CACHE_SECONDS=60, PLAN_CATALOG_SOURCE='database',
+)
+class DatabaseReimportTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.feed = Path(directory.name) / 'plans.ndjson'
+
+    def import_feed(self, deductible: str) -> None:
+        entry = {'plan_name': 'Campus Plan', 'for-adult': True, 'overall-deductible': deductible, 'cities': ['New Haven, CT']}
+        self.feed.write_text(json.dumps(entry) + '\n', encoding='utf-8')
+        call_command('import_plans', source=str(self.feed), stdout=StringIO())
+
+    def test_reimported_content_changes_the_version_and_the_card(self):
+        self.import_feed('$1,111 per year')
+        before = DatabasePlanIndex().version
+        self.assertContains(self.client.get('/product/'), '$1,111 per year')
+
+        self.import_feed('$2,222 per year')
+        self.assertNotEqual(DatabasePlanIndex().version, before)
+        page = self.client.get('/product/')
+        self.assertContains(page, '$2,222 per year')
+        self.assertNotContains(page, '$1,111 per year')
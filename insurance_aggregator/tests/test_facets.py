@@ -0,0 +1,48 @@
+from django.test import SimpleTestCase
+
+from insurance_aggregator.data_loader import filter_plans, iter_normalized_plans, summarize_plans
+from insurance_aggregator.facets import FACET_MEMBERS, PlanFacets
+
+CITIES = ['Boston, MA', 'New Haven, CT', 'Providence, RI']
+
+
+def _catalog() -> list:
+    plans = list(iter_normalized_plans())
+    # Spread the bundled plans over overlapping city sets so city counts vary.
+    for position, plan in enumerate(plans):
+        plan['cities'] = CITIES[position % 3:position % 3 + 1 + position % 2]
+    return plans
+
+
+class PlanFacetsTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.plans = _catalog()
+        cls.facets = PlanFacets(cls.plans)
+
+    def cells(self):
+        ages = [None] + sorted(set(self.facets.age_boundaries.tolist()) | {0, 24, 70})
+        for member in FACET_MEMBERS:
+            for age in ages:
+                for city in [None] + CITIES:
+                    yield member, age, city
+
+    def test_cells_match_summarize_plans_except_the_city_count(self):
+        for member, age, city in self.cells():
+            with self.subTest(member=member, age=age, city=city):
+                expected = summarize_plans(filter_plans(self.plans, member, age, city))
+                summary = self.facets.summary(member, age, city)
+                city_count = summary.pop('city_count')
+                expected_city_count = expected.pop('city_count')
+                self.assertEqual(summary, expected)
+                if city is None or not expected['plan_count']:
+                    self.assertEqual(city_count, expected_city_count)
+                else:
+                    # A city cell counts only the selected city, not every city its plans serve.
+                    self.assertEqual(city_count, 1)
+
+    def test_city_cell_differs_from_summarize_plans_city_count(self):
+        city = 'New Haven, CT'
+        self.assertGreater(summarize_plans(filter_plans(self.plans, '', None, city))['city_count'], 1)
+        self.assertEqual(self.facets.summary('', None, city)['city_count'], 1)
@@ -0,0 +1,63 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from insurance_aggregator.data_loader import iter_plan_records
+from insurance_aggregator.models import Plan
+
+
+class ImportPlansTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.feed = Path(directory.name) / 'plans.ndjson'
+
+    def write_feed(self, entries: list) -> None:
+        self.feed.write_text(''.join(json.dumps(entry) + '\n' for entry in entries), encoding='utf-8')
+
+    def import_feed(self) -> None:
+        call_command('import_plans', source=str(self.feed), stdout=StringIO())
+
+    def test_plans_sharing_a_name_are_kept_apart(self):
+        self.write_feed([
+            {'plan_name': 'Campus Plan', 'overall-deductible': '$100', 'cities': ['New Haven, CT']},
+            {'plan_name': 'Campus Plan', 'overall-deductible': '$900', 'cities': ['Boston, MA']},
+            {'plan_name': 'Other Plan', 'cities': ['Boston, MA']},
+        ])
+        self.import_feed()
+        self.import_feed()
+
+        records = [record for _, record in iter_plan_records(self.feed)]
+        rows = Plan.objects.order_by('position')
+        self.assertEqual([plan.slug for plan in rows], [record.slug for record in records])
+        self.assertEqual(
+            [plan.overall_deductible for plan in rows if plan.plan_name == 'Campus Plan'], ['$100', '$900'],
+        )
+
+    def test_removed_duplicate_is_deleted(self):
+        self.write_feed([{'plan_name': 'Campus Plan'}, {'plan_name': 'Campus Plan'}])
+        self.import_feed()
+        self.write_feed([{'plan_name': 'Campus Plan'}])
+        self.import_feed()
+        self.assertEqual(Plan.objects.count(), 1)
+
+    def test_reimport_stamps_only_changed_rows(self):
+        self.write_feed([
+            {'plan_name': 'Campus Plan', 'overall-deductible': '$100'},
+            {'plan_name': 'Other Plan', 'overall-deductible': '$200'},
+        ])
+        self.import_feed()
+        before = dict(Plan.objects.values_list('plan_name', 'updated_at'))
+
+        self.write_feed([
+            {'plan_name': 'Campus Plan', 'overall-deductible': '$150'},
+            {'plan_name': 'Other Plan', 'overall-deductible': '$200'},
+        ])
+        self.import_feed()
+        after = dict(Plan.objects.values_list('plan_name', 'updated_at'))
+        self.assertGreater(after['Campus Plan'], before['Campus Plan'])
+        self.assertEqual(after['Other Plan'], before['Other Plan'])
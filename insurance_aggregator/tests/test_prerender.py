@@ -0,0 +1,31 @@
+import tempfile
+
+from django.test import Client, TestCase, override_settings
+
+from insurance_aggregator.prerender import build_pages
+
+from .helpers import LOCAL_CACHES, PLAIN_STATIC
+
+
+@override_settings(CACHES=LOCAL_CACHES, STATICFILES_STORAGE=PLAIN_STATIC)
+class ContactPageCsrfTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(PRERENDERED_PAGES_DIR=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.build = build_pages()
+        self.client = Client(enforce_csrf_checks=True)
+
+    def test_contact_page_is_not_prerendered(self):
+        self.assertTrue((self.build / 'index.html').exists())
+        self.assertFalse((self.build / 'contact').exists())
+
+    def test_contact_form_carries_a_token_and_requires_it(self):
+        page = self.client.get('/contact/')
+        self.assertContains(page, 'csrfmiddlewaretoken')
+        self.assertEqual(self.client.post('/contact/', {'name': 'A'}).status_code, 403)
+        token = page.context['csrf_token']
+        response = self.client.post('/contact/', {'name': 'A', 'csrfmiddlewaretoken': str(token)})
+        self.assertContains(response, 'We received your message')
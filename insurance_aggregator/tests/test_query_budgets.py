@@ -0,0 +1,38 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from insurance_aggregator.query_budget import QueryRecorder, budget_for, budgeted_urls
+
+from .helpers import PLAIN_STATIC
+
+DUMMY_CACHE = {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+METRICS_TOKEN = 'budget-token'
+
+
+# Caches are disabled so every request takes the cold path the budgets describe.
+@override_settings(
+    CACHES={'default': DUMMY_CACHE, 'stamps': DUMMY_CACHE}, STATICFILES_STORAGE=PLAIN_STATIC, METRICS_TOKEN=METRICS_TOKEN,
+)
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('import_plans', stdout=StringIO())
+
+    def assert_within_budgets(self, source: str) -> None:
+        with override_settings(PLAN_CATALOG_SOURCE=source):
+            for url in budgeted_urls():
+                with self.subTest(source=source, url=url):
+                    recorder = QueryRecorder()
+                    with connection.execute_wrapper(recorder):
+                        response = self.client.get(url, HTTP_AUTHORIZATION=f'Bearer {METRICS_TOKEN}')
+                    self.assertEqual(response.status_code, 200)
+                    self.assertLessEqual(recorder.count, budget_for(response.resolver_match.func))
+
+    def test_file_source(self):
+        self.assert_within_budgets('file')
+
+    def test_database_source(self):
+        self.assert_within_budgets('database')
@@ -0,0 +1,45 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from insurance_aggregator.models import ProductPageContent
+from insurance_aggregator.page_cache import change_stamps
+
+from .helpers import LOCAL_CACHES, PLAIN_STATIC
+
+
+@override_settings(
+    CACHES=LOCAL_CACHES, STATICFILES_STORAGE=PLAIN_STATIC, PRODUCT_PAGE_CACHE_SECONDS=60, PLAN_CATALOG_SOURCE='file',
+)
+class ProductPageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_unlisted_budget_amounts_share_the_unfiltered_page(self):
+        unfiltered = self.client.get('/product/')
+        with self.assertNumQueries(0):
+            odd_amount = self.client.get('/product/?max_deductible=1234&max_oop=77')
+        self.assertEqual(odd_amount.content, unfiltered.content)
+
+    def test_listed_budget_amount_filters_the_page(self):
+        response = self.client.get('/product/?max_deductible=500')
+        self.assertEqual(response.context['max_deductible'], 500)
+
+    def test_change_stamps_survive_page_cache_culling(self):
+        stamps = change_stamps(ProductPageContent)
+        cache.clear()
+        self.assertEqual(change_stamps(ProductPageContent), stamps)
+
+    def test_city_spellings_share_the_resolved_city_page(self):
+        typed = self.client.get('/product/?city=new+haven+connecticut')
+        self.assertTrue(typed.context['city_corrected'])
+        with self.assertNumQueries(0):
+            other_spelling = self.client.get('/product/?city=NEW+HAVEN,+CT')
+        self.assertEqual(other_spelling.content, typed.content)
+
+    def test_unmatched_city_input_is_not_echoed_or_keyed(self):
+        first = self.client.get('/product/?city=qqzzx')
+        self.assertTrue(first.context['city_unmatched'])
+        self.assertNotContains(first, 'qqzzx')
+        with self.assertNumQueries(0):
+            second = self.client.get('/product/?city=xxzzq')
+        self.assertEqual(second.content, first.content)
@@ -0,0 +1,164 @@
+"""
+Per-request phase timings, reported as a ``Server-Timing`` header and a log line.
+
+``ServerTimingMiddleware`` samples ``SERVER_TIMING_SAMPLE_RATE`` of the
+requests and gives each sampled one a collector in a context variable.
+``timed(phase)`` adds the duration of a block, or of every call to a decorated
+function, to the current request's phase. Outside a sampled request it costs
+one context variable lookup. SQL queries are timed by a wrapper installed on
+every database connection, so ``db`` is counted wherever a query runs. Phases
+can nest: a query issued while rendering counts towards both ``db`` and
+``render``.
+
+Context variables follow a request through ``sync_to_async`` and
+``asyncio.gather``, so async views are covered the same way.
+"""
+
+import json
+import logging
+import random
+from contextvars import ContextVar
+from functools import wraps
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('insurance_aggregator_timings', default=None)
+
+
+class RequestTimings:
+    def __init__(self):
+        self.started = perf_counter()
+        # phase -> [seconds, calls], in the order phases first finished.
+        self.phases = {}
+
+    def add(self, phase: str, seconds: float) -> None:
+        entry = self.phases.get(phase)
+        if entry is None:
+            self.phases[phase] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+    def header(self, total: float) -> str:
+        parts = [f'total;dur={total * 1000:.1f}']
+        for phase, (seconds, calls) in self.phases.items():
+            part = f'{phase};dur={seconds * 1000:.1f}'
+            if phase == 'db':
+                part += f';desc="{calls} quer{"y" if calls == 1 else "ies"}"'
+            elif calls > 1:
+                part += f';desc="{calls} calls"'
+            parts.append(part)
+        return ', '.join(parts)
+
+
+class timed:
+    """Time a block with ``with timed('phase'):`` or every call with ``@timed('phase')``."""
+
+    __slots__ = ('phase', 'timings', 'started')
+
+    def __init__(self, phase: str):
+        self.phase = phase
+
+    def __enter__(self):
+        self.timings = _current.get()
+        if self.timings is not None:
+            self.started = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.timings is not None:
+            self.timings.add(self.phase, perf_counter() - self.started)
+
+    def __call__(self, func):
+        phase = self.phase
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            timings = _current.get()
+            if timings is None:
+                return func(*args, **kwargs)
+            started = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timings.add(phase, perf_counter() - started)
+
+        return wrapper
+
+
+def _time_query(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add('db', perf_counter() - started)
+
+
+def install_query_timer(sender, connection, **kwargs) -> None:
+    """``connection_created`` receiver that adds the ``db`` timer to a new connection."""
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _time_query)
+
+
+class ServerTimingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if settings.SERVER_TIMING_SAMPLE_RATE <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = settings.SERVER_TIMING_SAMPLE_RATE
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _sampled(self) -> bool:
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._sampled():
+            return self.get_response(request)
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._report(request, response, timings)
+
+    async def __acall__(self, request):
+        if not self._sampled():
+            return await self.get_response(request)
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._report(request, response, timings)
+
+    def _report(self, request, response, timings: RequestTimings):
+        total = perf_counter() - timings.started
+        response['Server-Timing'] = timings.header(total)
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'phases': {
+                phase: {'ms': round(seconds * 1000, 2), 'calls': calls}
+                for phase, (seconds, calls) in timings.phases.items()
+            },
+        }
+        logger.info('request timing %s', json.dumps(record, separators=(',', ':')))
+        return response
@@ -17,12 +17,17 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path
 
-from insurance_aggregator import views
+from insurance_aggregator import api, metrics, views
 
 urlpatterns = [
     path('', views.home, name='home'),
     path('about/', views.about, name='about'),
     path('product/', views.product, name='product'),
+    path('compare/', views.compare, name='compare'),
     path('contact/', views.contact, name='contact'),
+    path('api/plans/', api.plans, name='api-plans'),
+    path('api/cities/', api.cities, name='api-cities'),
+    path('api/facets/', api.facets, name='api-facets'),
+    path('metrics', metrics.metrics, name='metrics'),
     path('admin/', admin.site.urls),
 ]
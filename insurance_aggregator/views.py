@@ -1,24 +1,31 @@
+import asyncio
 from typing import Optional
 from types import SimpleNamespace
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
 from django.shortcuts import render
 from django.templatetags.static import static
 
-from .data_loader import (
-    comparison_fields,
-    filter_plans,
-    get_unique_cities,
-    load_plan_catalog,
-    summarize_plans,
-)
+from .catalog import get_plan_source
+from .data_loader import filter_plans, summarize_plans, top_plans
+from .metrics import cache_lookup
 from .models import (
     AboutPageContent,
+    AboutValue,
     AudienceSegment,
     ContactPageContent,
+    HomeFeature,
     HomePageContent,
+    HomeStat,
     PartnerOrganization,
     ProductPageContent,
 )
+from .page_cache import acached_content, cache_key, change_stamps
+from .query_budget import query_budget
+from .timing import timed
 
 MEMBER_OPTIONS = [
     {'value': 'adult', 'label': 'Adult Student', 'description': 'Age 18–64 coverage', 'icon': '👤'},
@@ -27,8 +34,22 @@ MEMBER_OPTIONS = [
     {'value': 'government', 'label': 'Gov & Public Programs', 'description': 'Medicaid, CHIP, TRICARE, etc.', 'icon': '🏛️'},
 ]
 
+SORT_OPTIONS = [
+    {'value': '', 'label': 'Best match'},
+    {'value': 'deductible', 'label': 'Lowest deductible'},
+    {'value': 'oop', 'label': 'Lowest out-of-pocket max'},
+]
+
 DEFAULT_AGE = 24
 
+# Budget limits the plan builder offers. Other amounts are ignored on the page,
+# which keeps the number of cached pages bounded; the API accepts any amount.
+DEDUCTIBLE_LIMITS = [0, 250, 500, 1000, 2500, 5000]
+OOP_LIMITS = [2500, 5000, 7500, 10000]
+
+# Columns a /compare/ table shows at most.
+COMPARE_MAX_PLANS = 4
+
 
 def _default_home_content():
     return {
@@ -99,20 +120,70 @@ def _default_partners():
     ]
 
 
-def home(request):
-    home_page = HomePageContent.objects.prefetch_related('features', 'stats').first()
-    partners_qs = PartnerOrganization.objects.all()
+async def _alist(queryset) -> list:
+    return [row async for row in queryset]
+
+
+async def _load_home_content() -> Optional[dict]:
+    home_page = await HomePageContent.objects.order_by('id').afirst()
+    if home_page is None:
+        return None
+    features, stats = await asyncio.gather(
+        _alist(home_page.features.values('icon', 'title', 'description')),
+        _alist(home_page.stats.values('value', 'label', 'description')),
+    )
+    return {'home_page': home_page, 'features': features, 'stats': stats}
+
+
+async def _load_partners() -> list:
+    return await _alist(PartnerOrganization.objects.values('name', 'campus', 'website', 'logo_url'))
+
+
+async def _load_about_content() -> Optional[tuple]:
+    about_page = await AboutPageContent.objects.order_by('id').afirst()
+    if about_page is None:
+        return None
+    return about_page, await _alist(about_page.values.all())
+
+
+async def _load_product_content() -> Optional[ProductPageContent]:
+    return await ProductPageContent.objects.order_by('id').afirst()
+
+
+async def _load_contact_content() -> Optional[ContactPageContent]:
+    return await ContactPageContent.objects.order_by('id').afirst()
+
+
+async def _load_audience_segments() -> list:
+    return await _alist(AudienceSegment.objects.all())
 
-    if home_page:
-        features = list(home_page.features.values('icon', 'title', 'description'))
-        stats = list(home_page.stats.values('value', 'label', 'description'))
-        home_data = home_page
+
+# Views are async: independent content reads are awaited together, and
+# templates and catalog work run through ``sync_to_async`` so they never block
+# the event loop under ASGI. Under WSGI Django runs them the same way.
+
+_render = timed('render')(render)
+
+
+@query_budget(4)
+async def home(request):
+    with timed('content'):
+        home_content, partners = await asyncio.gather(
+            acached_content('home', (HomePageContent, HomeFeature, HomeStat), _load_home_content),
+            acached_content('partners', (PartnerOrganization,), _load_partners),
+        )
+
+    if home_content:
+        features = home_content['features']
+        stats = home_content['stats']
+        home_data = home_content['home_page']
     else:
         features = _default_features()
         stats = _default_home_stats()
         home_data = SimpleNamespace(**_default_home_content())
 
-    partners = list(partners_qs.values('name', 'campus', 'website', 'logo_url')) or _default_partners()
+    # Copied because each request adds its own animation delay.
+    partners = [dict(partner) for partner in partners] or _default_partners()
     for index, partner in enumerate(partners):
         partner['delay'] = f'{0.1 * index:.1f}s'
 
@@ -122,13 +193,15 @@ def home(request):
         'home_stats': stats,
         'partner_universities': partners,
     }
-    return render(request, 'home.html', context)
+    return await sync_to_async(_render)(request, 'home.html', context)
 
 
-def about(request):
-    about_page = AboutPageContent.objects.prefetch_related('values').first()
-    if about_page:
-        values = about_page.values.all()
+@query_budget(2)
+async def about(request):
+    with timed('content'):
+        about_content = await acached_content('about', (AboutPageContent, AboutValue), _load_about_content)
+    if about_content:
+        about_page, values = about_content
     else:
         about_page = SimpleNamespace(
             kicker='Our mission',
@@ -144,7 +217,7 @@ def about(request):
             SimpleNamespace(icon='🤝', title='Support', description='Live chat, multilingual onboarding, and campus partners.'),
         ]
 
-    return render(request, 'about.html', {'about_content': about_page, 'about_values': values})
+    return await sync_to_async(_render)(request, 'about.html', {'about_content': about_page, 'about_values': values})
 
 
 def _sanitize_member_choice(choice: str, valid_values: set, default_value: str) -> str:
@@ -153,8 +226,8 @@ def _sanitize_member_choice(choice: str, valid_values: set, default_value: str)
     return default_value
 
 
-def _member_options_with_defaults():
-    segments = list(AudienceSegment.objects.all())
+async def _member_options_with_defaults():
+    segments = await acached_content('audience-segments', (AudienceSegment,), _load_audience_segments)
     if segments:
         options = [
             {
@@ -180,47 +253,57 @@ def _parse_age(raw_age: Optional[str]) -> int:
     return max(0, min(80, value))
 
 
-def _build_comparison_rows(plans: list, specs: list) -> list:
-    rows = []
-    for spec in specs:
-        values = []
-        for plan in plans:
-            raw_value = plan.get(spec['key'])
-            if spec.get('type') == 'bool':
-                value = 'Yes' if raw_value else 'No'
-            else:
-                value = raw_value or '—'
-            values.append(value)
-        rows.append({'label': spec['label'], 'values': values})
-    return rows
-
-
-def product(request):
-    catalog = load_plan_catalog()
-    cities = get_unique_cities(catalog) or ['New Haven, CT']
-    member_options, default_member = _member_options_with_defaults()
-
-    selected_member = _sanitize_member_choice(
-        request.GET.get('member', default_member),
-        {option['value'] for option in member_options},
-        default_member,
+def _parse_amount(raw_amount: Optional[str]) -> Optional[int]:
+    if not raw_amount:
+        return None
+    try:
+        value = int(raw_amount.replace(',', '').lstrip('$'))
+    except (TypeError, ValueError):
+        return None
+    return max(0, value)
+
+
+def _parse_limit(raw_amount: Optional[str], limits: list) -> Optional[int]:
+    amount = _parse_amount(raw_amount)
+    return amount if amount in limits else None
+
+
+def _product_results(
+    source,
+    member: str,
+    age: int,
+    city: str,
+    sort: str,
+    max_deductible: Optional[int],
+    max_oop: Optional[int],
+) -> dict:
+    catalog = source.plans
+    filtered = filter_plans(
+        catalog,
+        member,
+        age,
+        city,
+        index=source.index,
+        max_deductible=max_deductible,
+        max_oop=max_oop,
     )
-    selected_age = _parse_age(request.GET.get('age'))
-    selected_city = request.GET.get('city') or cities[0]
-    if selected_city not in cities:
-        selected_city = cities[0]
-
-    filtered = filter_plans(catalog, selected_member, selected_age, selected_city)
     fallback_to_all = False
     if not filtered:
         filtered = catalog
         fallback_to_all = True
 
-    featured_plans = filtered[:4]
-    comparison_plans = filtered[:3]
-    field_specs = comparison_fields()
-    comparison_rows = _build_comparison_rows(comparison_plans, field_specs)
-    summary = summarize_plans(filtered)
+    featured_plans = top_plans(filtered, sort, 4)
+    # Cards and comparison columns come pre-rendered for this catalog version.
+    fragments = source.fragments
+    if max_deductible is None and max_oop is None:
+        # Precomputed per (member, age bucket, city); showing everything is the "any" cell.
+        with timed('summary'):
+            summary = source.facets.summary(*(('', None, None) if fallback_to_all else (member, age, city)))
+    else:
+        summary = summarize_plans(filtered)
+        if city and not fallback_to_all:
+            # Match the facet summaries, which count the selected city only.
+            summary['city_count'] = 1
     city_label = 'city' if summary['city_count'] == 1 else 'cities'
     plan_summary = (
         f"{summary['plan_count']} plans · {summary['provider_count']} providers · "
@@ -229,8 +312,23 @@ def product(request):
     plan_summary_secondary = (
         f"{summary['child_ready']} cover dependents · {summary['adult_ready']} adult-ready"
     )
+    return {
+        'plan_cards': fragments.cards(featured_plans),
+        'plan_summary': plan_summary,
+        'plan_summary_secondary': plan_summary_secondary,
+        'results_count': summary['plan_count'],
+        'fallback_to_all': fallback_to_all,
+        **fragments.comparison(featured_plans[:3]),
+    }
 
-    product_content = ProductPageContent.objects.first()
+
+@query_budget(2, database=10)
+async def product(request):
+    with timed('content'):
+        (member_options, default_member), product_content = await asyncio.gather(
+            _member_options_with_defaults(),
+            acached_content('product', (ProductPageContent,), _load_product_content),
+        )
     if not product_content:
         product_content = SimpleNamespace(
             kicker='Plan builder',
@@ -239,28 +337,131 @@ def product(request):
             summary_line='92+ plans · 18 insurers · 1 city',
             summary_secondary='Child-ready and adult-ready options filtered instantly.',
         )
+    # Filtering, summaries and rendering are CPU-bound and may query the Plan table.
+    return await sync_to_async(_product_page)(request, member_options, default_member, product_content)
+
+
+def _product_page(request, member_options: list, default_member: str, product_content) -> HttpResponse:
+    source = get_plan_source()
+    city_index = source.city_index
+    default_city = city_index.cities[0] if len(city_index) else 'New Haven, CT'
+
+    selected_member = _sanitize_member_choice(
+        request.GET.get('member', default_member),
+        {option['value'] for option in member_options},
+        default_member,
+    )
+    selected_age = _parse_age(request.GET.get('age'))
+    # Free-text input is matched to the closest catalog city; when nothing is
+    # close enough the page falls back to the default and says so.
+    requested_city = request.GET.get('city', '').strip()
+    resolved_city = city_index.resolve(requested_city) if requested_city else None
+    selected_city = resolved_city or default_city
+    # The page never echoes the raw input, so every spelling that resolves to
+    # one city shares one cached page.
+    city_unmatched = bool(requested_city) and resolved_city is None
+    city_corrected = resolved_city is not None and resolved_city != requested_city
+
+    selected_sort = request.GET.get('sort', '')
+    if selected_sort not in {option['value'] for option in SORT_OPTIONS}:
+        selected_sort = ''
+    max_deductible = _parse_limit(request.GET.get('max_deductible'), DEDUCTIBLE_LIMITS)
+    max_oop = _parse_limit(request.GET.get('max_oop'), OOP_LIMITS)
+    if max_deductible is None and max_oop is None:
+        # Facet counts ignore cost limits, so they are only shown without them.
+        facets = source.facets
+        member_options = [
+            dict(option, plan_count=facets.count(option['value'], selected_age, selected_city))
+            for option in member_options
+        ]
+
+    cache_seconds = settings.PRODUCT_PAGE_CACHE_SECONDS
+    filters = (selected_member, selected_city, selected_sort, max_deductible, max_oop)
+    page_key = cache_key(
+        'product-page',
+        source.version,
+        *change_stamps(ProductPageContent, AudienceSegment),
+        selected_age,
+        city_unmatched,
+        city_corrected,
+        *filters,
+    )
+    if cache_seconds:
+        with timed('cache'):
+            content = cache.get(page_key)
+        cache_lookup('product-page', content is not None)
+        if content is not None:
+            return HttpResponse(content)
+
+    # Ages in one catalog age bucket select the same plans, so they share results.
+    results_key = cache_key('product-results', source.version, source.index.age_bucket(selected_age), *filters)
+    results = None
+    if cache_seconds:
+        with timed('cache'):
+            results = cache.get(results_key)
+        cache_lookup('product-results', results is not None)
+    if results is None:
+        results = _product_results(
+            source, selected_member, selected_age, selected_city, selected_sort, max_deductible, max_oop,
+        )
+        if cache_seconds:
+            cache.set(results_key, results, cache_seconds)
 
     context = {
         'member_options': member_options,
-        'cities': cities,
         'selected_member': selected_member,
         'selected_age': selected_age,
         'selected_city': selected_city,
-        'featured_plans': featured_plans,
-        'plan_summary': plan_summary,
-        'plan_summary_secondary': plan_summary_secondary,
-        'results_count': summary['plan_count'],
-        'fallback_to_all': fallback_to_all,
-        'comparison_plans': comparison_plans,
-        'comparison_rows': comparison_rows,
+        'city_unmatched': city_unmatched,
+        'city_corrected': city_corrected,
+        'sort_options': SORT_OPTIONS,
+        'selected_sort': selected_sort,
+        'max_deductible': max_deductible,
+        'max_oop': max_oop,
+        'deductible_limits': DEDUCTIBLE_LIMITS,
+        'oop_limits': OOP_LIMITS,
         'product_content': product_content,
+        **results,
+    }
+    response = _render(request, 'product.html', context)
+    if cache_seconds:
+        cache.set(page_key, response.content, cache_seconds)
+    return response
+
+
+def _parse_slugs(values: list) -> list:
+    # ``ids`` may repeat (checkboxes) or hold a comma-separated list (shared links).
+    slugs = (slug.strip() for value in values for slug in value.split(','))
+    return list(dict.fromkeys(slug for slug in slugs if slug))
+
+
+@query_budget(0, database=4)
+async def compare(request):
+    return await sync_to_async(_compare_page)(request)
+
+
+def _compare_page(request) -> HttpResponse:
+    requested = _parse_slugs(request.GET.getlist('ids'))
+    shown = requested[:COMPARE_MAX_PLANS]
+    source = get_plan_source()
+    plans = source.lookup(shown)
+    found = {plan.slug for plan in plans}
+    context = {
+        'compared_plans': plans,
+        'missing_ids': [slug for slug in shown if slug not in found],
+        'dropped_count': len(requested) - len(shown),
+        'compare_max': COMPARE_MAX_PLANS,
+        # Columns are gathered from the catalog version's finished cells.
+        **source.fragments.comparison(plans),
     }
-    return render(request, 'product.html', context)
+    return _render(request, 'compare.html', context)
 
 
-def contact(request):
+@query_budget(1)
+async def contact(request):
     submitted = request.method == 'POST'
-    contact_content = ContactPageContent.objects.first()
+    with timed('content'):
+        contact_content = await acached_content('contact', (ContactPageContent,), _load_contact_content)
     if not contact_content:
         contact_content = SimpleNamespace(
             kicker='We are here to help',
@@ -268,4 +469,4 @@ def contact(request):
             intro='Email us or use the form below. We respond within one business day.',
             support_email='support@insurancebuddy.com',
         )
-    return render(request, 'contact.html', {'submitted': submitted, 'contact_content': contact_content})
+    return await sync_to_async(_render)(request, 'contact.html', {'submitted': submitted, 'contact_content': contact_content})